@@ -0,0 +1,95 @@
+from monitor_query import evaluation_frequency_seconds, evaluation_window_seconds
+
+# Rough duration of a single synthetic test run, by test type
+synthetic_run_seconds = {'api': 10, 'browser': 180}
+
+# Seconds between scheduled runs of a synthetic test without tick_every
+default_tick_every = 300
+
+# A wait gives up after wait_budget_factor times the latest expected state change plus wait_budget_margin,
+# kept between min_wait_budget and max_wait_budget seconds; monitors evaluated hourly (windows over a day)
+# always get at least one evaluation plus the margin
+wait_budget_factor = 2
+wait_budget_margin = 60
+min_wait_budget = 60
+max_wait_budget = 3600
+
+# Seconds allowed for the initial OK check, which only has to see the current state once
+initial_check_budget = 60
+
+# Polls spread over a transition window, and the fewest seconds between two polls of a monitor, so a flip
+# is seen within about a sixth of its window and no monitor is polled more often than on a fixed schedule
+dense_polls = 6
+min_poll_interval = 10
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class PollSchedule:
+    """When to poll a monitor expected to change state between earliest and latest seconds.
+
+    Before the window the next poll waits for its start, inside it the
+    window is covered with roughly dense_polls polls, and after it the
+    interval backs off geometrically up to max_interval. No two polls are
+    closer than min_interval.
+    """
+
+    def __init__(self, earliest, latest, min_interval=min_poll_interval, max_interval=60, dense_polls=dense_polls):
+        self.earliest = earliest
+        self.latest = max(earliest, latest)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.dense_polls = dense_polls
+
+    def next_delay(self, elapsed):
+        """Return how many seconds to wait before the next poll, elapsed seconds into the wait."""
+        if elapsed < self.earliest:
+            return _clamp(self.earliest - elapsed, self.min_interval, self.max_interval)
+        if elapsed <= self.latest:
+            return _clamp((self.latest - self.earliest) / self.dense_polls, self.min_interval, self.max_interval)
+        return _clamp((elapsed - self.latest) / 2, self.min_interval, self.max_interval)
+
+
+def expected_transition_window(item):
+    """Estimate (earliest, latest) seconds after a change until the monitor behind item flips state.
+
+    item is a monitor or a synthetic test as returned by the list endpoints.
+    """
+    options = item.get('options') or {}
+
+    if 'config' in item:
+        # Synthetic test: the monitor flips once a triggered run (and its retries) has failed.
+        run_seconds = synthetic_run_seconds.get(item.get('type'), synthetic_run_seconds['api'])
+        retry = options.get('retry') or {}
+        retries = retry.get('count', 0)
+        retry_seconds = retries * (run_seconds + retry.get('interval', 300) / 1000)
+        latest = run_seconds + retry_seconds + options.get('min_failure_duration', 0) + evaluation_frequency_seconds(None)
+        return run_seconds, latest
+
+    # Standard monitor: the next evaluation sees the change, delayed by evaluation_delay if any.
+    window = evaluation_window_seconds(item.get('query'))
+    latest = evaluation_frequency_seconds(window) + (options.get('evaluation_delay') or 0)
+    return 0, latest
+
+
+def wait_budget(item, transition_window=None):
+    """Return how many seconds to wait for the monitor behind item to change state before giving up.
+
+    transition_window is the (earliest, latest) estimate for the change,
+    expected_transition_window(item) by default. Synthetic tests also get
+    one tick_every interval, in case the manual trigger is lost and only
+    the next scheduled run sees the change.
+    """
+    _, latest = transition_window or expected_transition_window(item)
+    budget = latest * wait_budget_factor + wait_budget_margin
+    if 'config' in item:
+        budget += (item.get('options') or {}).get('tick_every') or default_tick_every
+    return _clamp(budget, min_wait_budget, max(max_wait_budget, latest + wait_budget_margin))
+
+
+def expected_drill_seconds(item):
+    """Estimate how long a full drill of item takes, from its Alert and OK transitions."""
+    _, latest = expected_transition_window(item)
+    return 2 * latest
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import time
+
+# Drill phases in order. A drill is checkpointed on entering each one, before the
+# request or wait it names, so a resumed drill repeats at most that one step; a
+# drill resumed at 'mutating' is reverted instead, so no monitor is broken twice.
+drill_phases = ('new', 'mutating', 'alert_wait', 'reverting', 'ok_wait', 'done')
+
+
+def pending(phase, step):
+    """Return True if a drill resuming at phase still has to run step."""
+    return drill_phases.index(phase) <= drill_phases.index(step)
+
+
+class DrillCheckpoint:
+    """Durable per-monitor drill state in SQLite, written at every phase transition.
+
+    Before a monitor is mutated its original configuration and result row are
+    stored, so a killed run can be resumed: finished monitors are skipped and
+    in-flight ones continue from their last phase with the saved original,
+    including monitors that were left mutated. A shared checkpoint lives on
+    storage other hosts reach, so a sharded run can be taken over there; it
+    keeps SQLite's default rollback journal, as WAL needs memory shared on
+    one host and does not work over a network filesystem.
+    """
+
+    def __init__(self, filename=':memory:', shared=False):
+        self.filename = filename
+        self.shared = shared
+        self._db = None
+
+    def open(self, resume=False):
+        """Open the store, discarding any earlier run unless resume is set."""
+        db = self._connect()
+        if not resume:
+            with db:
+                db.execute("DELETE FROM drills")
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.filename, isolation_level=None)
+            if self.shared:
+                # Set explicitly, since a file created in WAL mode stays in it
+                self._db.execute("PRAGMA journal_mode=DELETE")
+            else:
+                # WAL keeps every committed phase across a killed process without an fsync per write
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS drills (
+                    monitor_id TEXT PRIMARY KEY,
+                    drill_type TEXT NOT NULL,
+                    phase TEXT NOT NULL,
+                    item TEXT,
+                    row TEXT,
+                    updated_at REAL NOT NULL
+                )""")
+        return self._db
+
+    def load(self, monitor_id):
+        """Return {drill_type, phase, item, row} for a monitor, or None if it has not been drilled."""
+        found = self._connect().execute(
+            "SELECT drill_type, phase, item, row FROM drills WHERE monitor_id = ?", (str(monitor_id),)).fetchone()
+        if found is None:
+            return None
+        drill_type, phase, item, row = found
+        return {
+            'drill_type': drill_type,
+            'phase': phase,
+            'item': json.loads(item) if item else None,
+            'row': json.loads(row) if row else None,
+        }
+
+    def save(self, monitor_id, drill_type, phase, item=None, row=None):
+        """Record that a monitor's drill entered phase; item and row are kept from earlier phases unless given."""
+        self._connect().execute("""
+            INSERT INTO drills (monitor_id, drill_type, phase, item, row, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(monitor_id) DO UPDATE SET
+                drill_type = excluded.drill_type,
+                phase = excluded.phase,
+                item = COALESCE(excluded.item, drills.item),
+                row = COALESCE(excluded.row, drills.row),
+                updated_at = excluded.updated_at""",
+            (str(monitor_id), drill_type, phase,
+             json.dumps(item) if item is not None else None,
+             json.dumps(row, default=str) if row is not None else None,
+             time.time()))
+
+    def in_flight(self, drill_type=None):
+        """Return the saved original items of monitors whose drill started but did not finish."""
+        query = "SELECT item FROM drills WHERE phase NOT IN ('new', 'done') AND item IS NOT NULL"
+        params = ()
+        if drill_type is not None:
+            query += " AND drill_type = ?"
+            params = (drill_type,)
+        return [json.loads(item) for (item,) in self._connect().execute(query, params)]
+
+    def counts(self):
+        """Return {phase: number of monitors} across the store."""
+        return dict(self._connect().execute("SELECT phase, COUNT(*) FROM drills GROUP BY phase").fetchall())
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def check_interrupted_run(checkpoint, resume, fresh):
+    """Return False, after explaining why, if a new run would forget monitors an interrupted run left mid-drill."""
+    if resume or fresh:
+        return True
+    in_flight = checkpoint.in_flight()
+    if not in_flight:
+        return True
+    print(f"{len(in_flight)} monitor(s) from an interrupted run may still be mutated (checkpoint: {checkpoint.filename}).")
+    print("Rerun with --resume to finish them, or with --fresh to discard the checkpoint and start over.")
+    return False
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from datadog_common.async_client import AsyncDatadogClient
+from datadog_common.discovery import aiter_monitors, aiter_synthetic_tests, is_synthetic_monitor
+from datadog_common.response_cache import ResponseCache, cache_filename
+from checkpoint import DrillCheckpoint, check_interrupted_run
+from drill_engine import DrillEngine, run_drills
+from drill_metrics import DrillMetrics
+from drill_strategies import combined_fieldnames, drill_any, strategies
+from eligibility import EligibilityFilter
+from result_journal import ResultJournal
+from sharding import ShardLeases, merge_results, shard_filename, shard_of
+from waves import WaveRollout
+
+# Datadog API details; DATADOG_URL points the script at another site or at load_testing/fake_datadog.py
+api_key = "xxxx"
+app_key = "xxxx"
+datadog_url = os.environ.get("DATADOG_URL", "https://us5.datadoghq.com/")
+
+# GET responses reused within the run and kept in a per-site, per-organization file for the next one;
+# lists and monitor states are revalidated with If-None-Match, so an unchanged result costs a 304
+response_cache = ResponseCache(cache_filename(datadog_url, api_key))
+
+# Pooled API client shared by every drill in this process
+client = AsyncDatadogClient(datadog_url, api_key, app_key, cache=response_cache)
+
+# Monitor types drilled in this run: any of 'Standard', 'API' and 'Browser'
+drill_types = ['Standard', 'API', 'Browser']
+
+# CSV file to store the output of every monitor type; standard.py, api.py and browse.py use their own
+csv_filename = 'drill_results.csv'
+csv_fieldnames = combined_fieldnames(strategies.values())
+
+# Drill phase timings and API latency histograms, exported as OpenMetrics text and JSON at the end of the run
+drill_metrics = DrillMetrics()
+metrics_filename_prefix = 'drill_metrics'
+
+# Append-only journal of row updates, compacted into the CSV at the end of the run
+result_journal = ResultJournal(f"{csv_filename}.journal", csv_fieldnames)
+
+# Per-monitor drill phases and original configurations, so an interrupted run can be resumed
+checkpoint_filename = 'drill_checkpoint.db'
+drill_checkpoint = DrillCheckpoint(checkpoint_filename)
+
+# Number of monitor IDs looked up per search request when polling states
+state_batch_size = 100
+
+# Maximum number of drills running at the same time
+max_concurrent_drills = 1000
+
+# 'adaptive' polls around each monitor's expected state change; 'fixed' polls every 10 seconds
+polling_mode = 'adaptive'
+
+# Port for Datadog monitor webhooks (see webhook_receiver.py); drills resume as soon as a notification
+# arrives and states are only polled every webhook_polling_interval seconds. None polls as usual.
+webhook_port = None
+webhook_polling_interval = 60
+
+# Address the webhook receiver listens on, and the token webhooks must carry as their URL path;
+# without DRILL_WEBHOOK_TOKEN a random token is printed at the start of the run
+webhook_host = '127.0.0.1'
+webhook_token = os.environ.get("DRILL_WEBHOOK_TOKEN")
+
+# Seconds the whole run may take; when set, the quickest drills run first and drills that would not
+# finish in time are skipped. None lets the run take as long as it needs.
+drill_deadline = None
+
+# Drill monitors and tests in waves grouped by this tag key (e.g. 'team', 'service') or 'recipient';
+# None drills every item as soon as it is discovered. Planning waves holds the whole discovery stream
+# in memory before the first drill starts, so waves are opt-in.
+wave_group_by = None
+
+# Items per wave, and seconds before the next wave starts if the previous one is still running
+wave_size = 100
+wave_interval = 300
+
+# Maximum number of monitors and tests mutated into the Alert phase at the same time, across all shards
+max_alerting_monitors = 200
+
+# Sharded runs: every runner drills the monitors whose ID hashes to its shard and writes its own
+# checkpoint, journal, CSV and metrics; leases in <checkpoint>_leases.db on shared storage keep runners apart
+shard_count = 1
+shard_index = 0
+shard_lease_seconds = 300
+
+def create_engine():
+    """Create a drill engine configured from the settings above."""
+    return DrillEngine(client, max_concurrent_drills=max_concurrent_drills, state_batch_size=state_batch_size,
+                       polling_mode=polling_mode, metrics=drill_metrics, checkpoint=drill_checkpoint,
+                       results=result_journal, webhook_port=webhook_port,
+                       webhook_polling_interval=webhook_polling_interval, webhook_host=webhook_host,
+                       webhook_token=webhook_token, deadline=drill_deadline)
+
+def drill_item(item):
+    """Blocking entry point: drill one monitor or synthetic test with the settings above.
+
+    Its result row is appended to the result journal, which is flushed before returning.
+    """
+    try:
+        run_drills(create_engine(), [item], drill_any)
+    finally:
+        result_journal.close()
+
+def in_shard(item):
+    """Return True if item belongs to this runner's shard."""
+    if shard_count == 1:
+        return True
+    monitor_id = item.get('monitor_id') if 'public_id' in item else item.get('id')
+    return shard_of(monitor_id, shard_count) == shard_index
+
+async def hold_shard_lease(leases, engine):
+    """Renew this runner's shard lease until cancelled; once it is lost or cannot be renewed, start no new drills."""
+    while True:
+        await asyncio.sleep(leases.lease_seconds / 3)
+        try:
+            # The SQLite lock can take seconds to get, so renew off the event loop
+            renewed = await asyncio.to_thread(leases.acquire, shard_index, shard_count)
+        except sqlite3.Error as e:
+            engine.stop_starting(f"could not renew the lease on shard {shard_index} of {shard_count} ({e})")
+            return
+        if not renewed:
+            engine.stop_starting(f"lost the lease on shard {shard_index} of {shard_count} to another runner")
+            return
+
+async def aiter_drill_targets(synthetic_monitors):
+    """Stream the standard monitors, then the synthetic tests, of the selected types.
+
+    The monitor list is paged even when only tests are drilled: its synthetic
+    monitors' state and mute are recorded into synthetic_monitors
+    (monitor ID -> (overall_state, muted)) before the first test is yielded,
+    so the eligibility filter can judge each test by its monitor. API and
+    browser tests come from a single pass over the synthetics list.
+    """
+    synthetic_types = {drill_type.lower() for drill_type in drill_types if drill_type != 'Standard'}
+    async for monitor in aiter_monitors(client, include_synthetics=bool(synthetic_types)):
+        if is_synthetic_monitor(monitor):
+            synthetic_monitors[monitor.get('id')] = (
+                monitor.get('overall_state'), bool((monitor.get('options') or {}).get('silenced')))
+        elif 'Standard' in drill_types and in_shard(monitor):
+            yield monitor
+
+    if synthetic_types:
+        async for test in aiter_synthetic_tests(client):
+            if test.get('type') in synthetic_types and in_shard(test):
+                yield test
+
+async def drill_everything(resume=False, leases=None):
+    """Drill every selected monitor and test; return False if the run stopped starting drills early."""
+    # Every runner takes its share of the alert cap
+    max_alerting = max(1, max_alerting_monitors // shard_count)
+    async with create_engine() as engine:
+        lease_task = asyncio.ensure_future(hold_shard_lease(leases, engine)) if leases is not None else None
+        # Skip monitors and tests that cannot be drilled from their list responses alone
+        synthetic_monitors = {}
+        eligibility = EligibilityFilter(engine, synthetic_monitors)
+        targets = await engine.prioritise(eligibility.filter(aiter_drill_targets(synthetic_monitors)))
+
+        # Resumed drills may mutate monitors too, so they count against the alert cap
+        engine.limit_alerting(max_alerting)
+        if resume:
+            # Finish the monitors the interrupted run left mid-drill before starting new ones
+            in_flight = drill_checkpoint.in_flight()
+            print(f"Resuming {len(in_flight)} monitor(s) left mid-drill by the interrupted run.")
+            await engine.run(in_flight, drill_any)
+
+        if wave_group_by:
+            # Roll the drill out in overlapping waves with a cap on alerting monitors
+            rollout = WaveRollout(wave_group_by, wave_size, max_alerting, wave_interval,
+                                  quickest_first=drill_deadline is not None)
+            drilled = await rollout.run(engine, targets, drill_any)
+        else:
+            # Stream every monitor and test page by page into the drill scheduler
+            drilled = await engine.run(targets, drill_any)
+        eligibility.print_summary()
+
+        if lease_task is not None:
+            lease_task.cancel()
+
+        if engine.stop_reason is not None:
+            print(f"Stopped starting drills early: {engine.stop_reason}")
+        elif drilled:
+            print(f"All {', '.join(drill_types)} monitors have been processed.")
+        else:
+            print("No monitors found or failed to fetch monitors.")
+        return engine.stop_reason is None
+
+def use_outputs(csv_name, checkpoint_name, metrics_prefix, shared=False):
+    """Point this runner at its CSV, journal, checkpoint and metrics files, with the columns of the drilled types.
+
+    shared marks a checkpoint other hosts may take over (see DrillCheckpoint).
+    """
+    global csv_filename, csv_fieldnames, checkpoint_filename, metrics_filename_prefix, drill_checkpoint, result_journal
+    csv_filename, checkpoint_filename, metrics_filename_prefix = csv_name, checkpoint_name, metrics_prefix
+    csv_fieldnames = combined_fieldnames(strategies[drill_type] for drill_type in drill_types)
+    drill_checkpoint = DrillCheckpoint(checkpoint_filename, shared=shared)
+    result_journal = ResultJournal(f"{csv_filename}.journal", csv_fieldnames)
+
+def use_shard(index, count):
+    """Point this runner at one shard and at that shard's checkpoint, journal, CSV and metrics files."""
+    global shard_index, shard_count
+    shard_index, shard_count = index, count
+    use_outputs(shard_filename(csv_filename, index, count), shard_filename(checkpoint_filename, index, count),
+                f"{metrics_filename_prefix}.shard-{index}-of-{count}", shared=True)
+
+def main(types=None, outputs=None,
+         description="Force every monitor and synthetic test into Alert, then revert it."):
+    """Run the drill from the command line.
+
+    standard.py, api.py and browse.py call this with a fixed list of types
+    and their own (CSV, checkpoint, metrics prefix) outputs.
+    """
+    global drill_deadline, wave_group_by
+    parser = argparse.ArgumentParser(description=description)
+    if types is None:
+        parser.add_argument("--types", default=','.join(drill_types),
+                            help="Comma-separated monitor types to drill (Standard, API, Browser)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run from its checkpoint")
+    parser.add_argument("--fresh", action="store_true", help="Discard the checkpoint of an interrupted run")
+    parser.add_argument("--deadline", type=float, default=drill_deadline,
+                        help="Seconds the whole run may take; drills that would not finish in time are skipped")
+    parser.add_argument("--waves", metavar="GROUP_BY", default=wave_group_by,
+                        help="Drill in waves grouped by this tag key (e.g. team, service) or 'recipient'")
+    parser.add_argument("--shard-count", type=int, default=shard_count, help="Number of runners sharing the drill")
+    parser.add_argument("--shard-index", default=None,
+                        help="Shard drilled by this runner (0 .. shard count - 1); by default the first free one")
+    parser.add_argument("--merge", action="store_true",
+                        help="Combine the result CSVs of a finished sharded run into one report and exit")
+    args = parser.parse_args()
+    drill_deadline = args.deadline
+    wave_group_by = args.waves
+
+    drill_types[:] = types or [drill_type for drill_type in args.types.split(',') if drill_type]
+    unknown = [drill_type for drill_type in drill_types if drill_type not in strategies]
+    if unknown:
+        parser.error(f"unknown monitor types: {', '.join(unknown)}")
+    use_outputs(*(outputs or (csv_filename, checkpoint_filename, metrics_filename_prefix)))
+
+    if args.merge:
+        if args.shard_count < 2:
+            parser.error("--merge needs the --shard-count of the sharded run")
+        missing = merge_results(csv_filename, args.shard_count, csv_fieldnames)
+        if missing:
+            print(f"No results found for shard(s): {', '.join(str(index) for index in missing)}; "
+                  f"{csv_filename} was left unchanged.")
+            sys.exit(1)
+        print(f"Merged the results of {args.shard_count} shards into {csv_filename}.")
+        return
+
+    leases = None
+    if args.shard_count > 1:
+        leases = ShardLeases(f"{os.path.splitext(checkpoint_filename)[0]}_leases.db", shard_lease_seconds)
+        if args.shard_index is None:
+            index = leases.acquire_any(args.shard_count)
+            if index is None:
+                print(f"All {args.shard_count} shards are taken by other runners or already finished.")
+                sys.exit(1)
+        else:
+            index = int(args.shard_index)
+            if not leases.acquire(index, args.shard_count):
+                print(f"Shard {index} of {args.shard_count} is taken by another runner or already finished.")
+                sys.exit(1)
+        use_shard(index, args.shard_count)
+        print(f"Drilling shard {shard_index} of {shard_count}.")
+
+    if not check_interrupted_run(drill_checkpoint, args.resume, args.fresh):
+        sys.exit(1)
+    drill_checkpoint.open(resume=args.resume)
+    result_journal.open('a' if args.resume else 'w')
+    completed = asyncio.run(drill_everything(resume=args.resume, leases=leases))
+    drill_checkpoint.close()
+    client.stats.print_summary()
+    response_cache.print_summary()
+    drill_metrics.export(metrics_filename_prefix, client.stats)
+
+    # Fold the result journal into the final CSV
+    result_journal.compact(csv_filename)
+
+    if leases is not None:
+        # A shard left unfinished is taken over by another runner, which resumes from its checkpoint
+        if completed:
+            leases.finish(shard_index, shard_count)
+        leases.close()
+
+    # Last, so a cache that cannot be written never holds back the results
+    response_cache.save()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import asyncio
+
+from adaptive_polling import PollSchedule, expected_drill_seconds
+from checkpoint import DrillCheckpoint
+from drill_metrics import DrillMetrics
+from scheduler import DrillScheduler
+from state_poller import StatePoller
+from trigger_batcher import TriggerBatcher
+from webhook_receiver import WebhookReceiver
+
+
+class AlertPhase:
+    """Slot held by a drill from just before it mutates a monitor until the revert is sent.
+
+    Entering waits for a free slot when the engine caps simultaneously
+    alerting monitors. release() may be called early, once the revert has
+    been sent, and is a no-op afterwards.
+    """
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._held = False
+
+    async def __aenter__(self):
+        if self._limiter is not None:
+            await self._limiter.acquire()
+            self._held = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._limiter.release()
+
+
+class DrillEngine:
+    """Drive mutate -> wait for Alert -> revert -> wait for OK drills as coroutines.
+
+    One engine owns the pooled non-blocking HTTP client, the shared state
+    poller and the drill scheduler, so a single process can hold tens of
+    thousands of drills in flight; each waiting drill costs a suspended
+    coroutine rather than an OS thread.
+    """
+
+    def __init__(self, client, max_concurrent_drills=1000, state_batch_size=100, polling_interval=10,
+                 polling_mode='adaptive', min_polling_interval=10, max_polling_interval=60, metrics=None,
+                 checkpoint=None, results=None, webhook_port=None, webhook_polling_interval=60,
+                 webhook_host='127.0.0.1', webhook_token=None, trigger_batch_window=0.5, deadline=None):
+        # client is an AsyncDatadogClient; the engine opens and closes its session
+        self.client = client
+        self.max_concurrent_drills = max_concurrent_drills
+        self.state_batch_size = state_batch_size
+        self.polling_mode = polling_mode
+        self.min_polling_interval = min_polling_interval
+        self.max_polling_interval = max_polling_interval
+        # Ticks only fetch monitors that are due, so adaptive schedules are checked five times per shortest interval
+        tick_interval = min_polling_interval / 5 if polling_mode == 'adaptive' else polling_interval
+        self.poller = StatePoller(self.fetch_monitor_states, polling_interval=polling_interval,
+                                  tick_interval=tick_interval)
+        self.alert_limiter = None
+        # Synthetic test triggers from every drill are sent together, one POST per batch
+        self.triggers = TriggerBatcher(self.post, batch_window=trigger_batch_window)
+        self.metrics = metrics if metrics is not None else DrillMetrics()
+        # Without a checkpoint file drill phases are only tracked in memory
+        self.checkpoint = checkpoint if checkpoint is not None else DrillCheckpoint()
+        # ResultJournal shared by every drill in the run; without one result rows are not kept
+        self.results = results
+        # With a webhook port, states pushed by Datadog resume drills and polling only backs them up
+        self.webhook = None
+        if webhook_port is not None:
+            self.webhook = WebhookReceiver(self.poller.notify, host=webhook_host, port=webhook_port, token=webhook_token)
+        self.webhook_polling_interval = webhook_polling_interval
+        # Seconds the whole run may take; drills that would not finish in time are not started
+        self.deadline = deadline
+        self.deadline_at = None
+        # Set by stop_starting(); drills that have not mutated their monitor yet leave it alone
+        self.stop_reason = None
+
+    async def __aenter__(self):
+        if self.deadline is not None:
+            self.deadline_at = asyncio.get_running_loop().time() + self.deadline
+        await self.client.open()
+        if self.webhook is not None:
+            self.webhook.start(asyncio.get_running_loop())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.triggers.close()
+        await self.poller.stop()
+        if self.webhook is not None:
+            self.webhook.stop()
+            print(f"Received {self.webhook.received} monitor webhooks ({self.webhook.ignored} ignored, "
+                  f"{self.webhook.rejected} rejected without the token).")
+        await self.client.close()
+
+    def limit_alerting(self, max_alerting):
+        """Allow at most max_alerting drills between mutation and revert at any moment."""
+        self.alert_limiter = asyncio.Semaphore(max_alerting) if max_alerting else None
+
+    def alert_phase(self):
+        """Return the AlertPhase a drill holds while its monitor is mutated."""
+        return AlertPhase(self.alert_limiter)
+
+    def stop_starting(self, reason):
+        """Let drills that already mutated their monitor finish, but start no new ones."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+            print(f"Starting no new drills: {reason}")
+
+    def time_left(self):
+        """Return the seconds left before the run deadline, or None without a deadline."""
+        if self.deadline_at is None:
+            return None
+        return max(0.0, self.deadline_at - asyncio.get_running_loop().time())
+
+    def has_time_for(self, seconds):
+        """Return True if work expected to take seconds still fits before the run deadline."""
+        time_left = self.time_left()
+        return time_left is None or seconds <= time_left
+
+    def wait_budget(self, seconds):
+        """Cut a wait budget down to the time left before the run deadline."""
+        time_left = self.time_left()
+        return seconds if time_left is None else min(seconds, time_left)
+
+    async def prioritise(self, items):
+        """With a deadline, return items collected and ordered quickest drill first; otherwise items unchanged.
+
+        Running short drills first fits the most drills into the deadline. It
+        needs every item up front, so an async discovery stream is collected.
+        """
+        if self.deadline is None:
+            return items
+        if hasattr(items, '__aiter__'):
+            items = [item async for item in items]
+        return sorted(items, key=expected_drill_seconds)
+
+    def record_result(self, monitor_id, row):
+        """Record the current result row of a monitor in the run's journal."""
+        if self.results is not None:
+            self.results.record(monitor_id, row)
+
+    async def get(self, path, **kwargs):
+        return await self.client.get(path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.client.put(path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.client.post(path, **kwargs)
+
+    async def trigger_synthetic_test(self, public_id):
+        """Trigger a synthetic test in the next batch; return (response, the test's results)."""
+        return await self.triggers.trigger(public_id)
+
+    async def fetch_monitor_states(self, monitor_ids):
+        """Fetch the current state of many monitors with one search request per batch of IDs."""
+        states = {}
+
+        for start in range(0, len(monitor_ids), self.state_batch_size):
+            batch = monitor_ids[start:start + self.state_batch_size]
+            params = {"query": f"id:({' OR '.join(batch)})", "per_page": len(batch)}
+            response = await self.get("/api/v1/monitor/search", params=params)
+
+            if response.status_code == 200:
+                for monitor in response.json().get('monitors', []):
+                    states[str(monitor.get('id'))] = monitor.get('status')
+            else:
+                print(f"Failed to fetch monitor states for {len(batch)} monitors, Status code: {response.status_code}")
+        return states
+
+    async def wait_for_state(self, monitor_id, desired_state, max_wait_time=600, transition_window=None):
+        """Wait until the monitor enters desired_state; return the state, or None on timeout.
+
+        In adaptive mode transition_window is the (earliest, latest) estimate
+        of when the state should flip, which drives the poll schedule; without
+        one the first poll happens right away and later ones back off. When
+        webhooks are received, polls are at least webhook_polling_interval
+        apart and only catch notifications that never arrive.
+        """
+        schedule = None
+        earliest, latest = transition_window or (0, 0)
+        if self.webhook is not None:
+            schedule = PollSchedule(earliest, latest, self.webhook_polling_interval,
+                                    max(self.webhook_polling_interval, self.max_polling_interval))
+        elif self.polling_mode == 'adaptive':
+            schedule = PollSchedule(earliest, latest, self.min_polling_interval, self.max_polling_interval)
+        return await self.poller.wait_for_state(monitor_id, desired_state, max_wait_time, schedule)
+
+    async def run(self, items, drill):
+        """Run drill(engine, item) for every item with at most max_concurrent_drills in flight.
+
+        items may be an async iterable, such as a paginated discovery stream, so
+        drills start while later pages are still loading. Returns the number of
+        items drilled.
+        """
+        async def run_drill(item):
+            await drill(self, item)
+
+        scheduler = DrillScheduler(run_drill, max_workers=self.max_concurrent_drills)
+        submitted = 0
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                await scheduler.submit(item)
+                submitted += 1
+        else:
+            for item in items:
+                await scheduler.submit(item)
+                submitted += 1
+        await scheduler.join()
+        return submitted
+
+
+def run_drills(engine, items, drill):
+    """Blocking entry point: run drills for items on a fresh event loop."""
+    async def run():
+        async with engine:
+            await engine.run(items, drill)
+
+    asyncio.run(run())
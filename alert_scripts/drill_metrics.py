@@ -0,0 +1,49 @@
+from datadog_common.metrics import MetricsRegistry, latency_buckets, phase_buckets
+
+# Drill phases timed for every monitor, in drill order
+drill_phases = ('mutation', 'time_to_alert', 'revert', 'time_to_ok')
+
+
+class DrillMetrics:
+    """Per-monitor drill phase timings, aggregated into histograms per monitor type.
+
+    mutation and revert are the latencies of the PUTs that break and restore
+    the monitor; time_to_alert and time_to_ok run from the end of those PUTs
+    until the state poller sees Alert and OK. Waits that time out are not
+    recorded, so slow monitors show up in the per-monitor timings instead.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.registry.register('drill_phase_seconds', "Duration of each drill phase by monitor type.",
+                               phase_buckets, ['type', 'phase'])
+        self.registry.register('datadog_api_request_duration_seconds',
+                               "Datadog API request latency by endpoint, including retries.",
+                               latency_buckets, ['endpoint'])
+        self.monitors = {}
+
+    def record(self, monitor_id, monitor_type, monitor_name, phase, seconds):
+        """Record how long one drill phase of a monitor took."""
+        self.registry.observe('drill_phase_seconds', seconds, type=monitor_type, phase=phase)
+        timings = self.monitors.setdefault(str(monitor_id), {'type': monitor_type, 'name': monitor_name, 'phases': {}})
+        timings['phases'][phase] = round(seconds, 3)
+
+    def slowest(self, phase, limit=10):
+        """Return the monitors that took longest in a phase, slowest first."""
+        timed = [dict(monitor_id=monitor_id, type=timings['type'], name=timings['name'],
+                      seconds=timings['phases'][phase])
+                 for monitor_id, timings in self.monitors.items() if phase in timings['phases']]
+        return sorted(timed, key=lambda entry: entry['seconds'], reverse=True)[:limit]
+
+    def export(self, filename_prefix, request_stats=None):
+        """Write <prefix>.prom (OpenMetrics) and <prefix>.json, including the API latency histograms of request_stats."""
+        if request_stats is not None:
+            for endpoint, histogram in request_stats.latency_histograms().items():
+                self.registry.add_histogram('datadog_api_request_duration_seconds', histogram, endpoint=endpoint)
+
+        self.registry.write_openmetrics(f"{filename_prefix}.prom")
+        self.registry.write_json(f"{filename_prefix}.json", {
+            'slowest': {phase: self.slowest(phase) for phase in drill_phases},
+            'monitors': self.monitors,
+        })
+        print(f"Saved drill metrics to {filename_prefix}.prom and {filename_prefix}.json")
@@ -0,0 +1,463 @@
+import copy
+import time
+from datetime import datetime
+
+from adaptive_polling import expected_drill_seconds, expected_transition_window, initial_check_budget, wait_budget
+from checkpoint import pending
+from monitor_query import mutate_query
+
+# URL a synthetic test is pointed at to make it fail
+invalid_test_url = "https://invalid-url-for-testing.com"
+
+# Fields of a synthetic test that the update endpoint rejects
+fields_to_remove = ['modified_at', 'created_at', 'creator', 'monitor_id', 'public_id']
+
+# Threshold options that would no longer be valid against a negated comparator
+conflicting_thresholds = ['warning', 'critical_recovery', 'warning_recovery']
+
+# Result columns shared by every monitor type
+common_fieldnames = ['MonitorAlertState', 'MonitorAlertStateTime', 'MonitorOkState', 'MonitorAlertOKStateTime',
+                     'Recipient', 'Remarks']
+
+
+def parse_recipients(message):
+    """Extract recipients from the monitor's message field."""
+    recipients = []
+    if message:
+        lines = message.split("\n")
+        for line in lines:
+            if '@' in line:
+                recipients.append(line.strip())
+    return recipients
+
+
+def remove_unnecessary_fields(test):
+    """Remove fields that should not be included in the update request."""
+    for field in fields_to_remove:
+        if field in test:
+            del test[field]
+    return test
+
+
+async def wait_for_state(engine, monitor_id, desired_state, message=None, max_wait_time=600, transition_window=None):
+    """Wait until the monitor enters the desired state (e.g., ALERT or OK)."""
+    current_state = await engine.wait_for_state(monitor_id, desired_state, max_wait_time, transition_window)
+
+    if current_state == desired_state:
+        print(f"Monitor ID: {monitor_id} is currently in state: {current_state}")
+        state_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        recipients = parse_recipients(message)
+        return current_state, state_time, recipients
+
+    print(f"Timed out waiting for monitor ID: {monitor_id} to enter {desired_state} state.")
+    return None, None, None
+
+
+async def trigger_synthetic_test(engine, test_public_id, test_name):
+    """Manually trigger the synthetic test, batched with the triggers of other drills.
+
+    A failed trigger is only reported: the test's scheduled run still picks
+    up the change, and the drill must go on to revert it.
+    """
+    try:
+        trigger_response, results = await engine.trigger_synthetic_test(test_public_id)
+    except Exception as exc:
+        print(f"  Error triggering synthetic test '{test_name}': {type(exc).__name__} {exc}".rstrip())
+        return
+
+    if trigger_response.status_code == 200 and results:
+        print(f"  Synthetic test '{test_name}' triggered successfully.")
+    elif trigger_response.status_code == 200:
+        print(f"  Synthetic test '{test_name}' was not triggered: it is missing from the trigger results.")
+    else:
+        print(f"  Error triggering synthetic test '{test_name}': {trigger_response.status_code} - {trigger_response.text}")
+
+
+def monitor_state_reason(state, muted):
+    """Return why a monitor in state, muted or not, cannot be drilled, or None if it can."""
+    if state and state != 'OK':
+        return f"Monitor in {state} state"
+    if muted:
+        return 'Monitor is muted'
+    return None
+
+
+class DrillStrategy:
+    """How one monitor type is broken, triggered and restored during a drill.
+
+    drill() runs the same mutate -> wait for Alert -> revert -> wait for OK
+    flow for every type; a strategy only supplies the type-specific parts:
+    which field is changed, the update request, and whether the check has to
+    be run by hand after each change.
+    """
+
+    # Value of the MonitorType column, also the drill type in checkpoints and metrics
+    monitor_type = None
+    # How the item is named in progress messages
+    label = 'Monitor'
+    # Result columns holding the original and the changed value
+    original_column = None
+    changed_column = None
+
+    @property
+    def csv_fieldnames(self):
+        return ['MonitorType', 'MonitorName', 'MonitorID', self.original_column, self.changed_column] + common_fieldnames
+
+    def identify(self, item):
+        """Return (monitor_id, name, resource_id) of an item; any of them may be missing."""
+        raise NotImplementedError
+
+    def skip_reason(self, item, synthetic_monitors=None):
+        """Return why item cannot be drilled, judging only from list responses, or None if it can.
+
+        synthetic_monitors maps monitor IDs to the (overall_state, muted) of
+        the synthetic monitors in the monitor list.
+        """
+        monitor_id, name, resource_id = self.identify(item)
+        if not monitor_id or not name or not resource_id:
+            return 'Missing required fields'
+        return None
+
+    def original_value(self, item):
+        raise NotImplementedError
+
+    def changed_value(self, item):
+        raise NotImplementedError
+
+    def update_path(self, item):
+        raise NotImplementedError
+
+    def broken(self, item):
+        """Return the update request body that makes the item alert, leaving item untouched."""
+        raise NotImplementedError
+
+    def restored(self, item):
+        """Return the update request body that puts the item back as it was."""
+        raise NotImplementedError
+
+    async def trigger(self, engine, item):
+        """Run the check right after a change, for types that do not evaluate on their own."""
+
+
+class StandardMonitorStrategy(DrillStrategy):
+    """Negate the threshold comparison of a standard monitor's query (see monitor_query.mutate_query)."""
+
+    monitor_type = 'Standard'
+    label = 'Monitor'
+    original_column = 'OriginalMonitorThreshold'
+    changed_column = 'ChangedMonitorThreshold'
+
+    def identify(self, item):
+        return item.get('id'), item.get('name'), item.get('id')
+
+    def skip_reason(self, item, synthetic_monitors=None):
+        reason = super().skip_reason(item) or monitor_state_reason(
+            item.get('overall_state'), (item.get('options') or {}).get('silenced'))
+        if reason:
+            return reason
+        _, reason = mutate_query(item.get('query'))
+        return reason
+
+    def original_value(self, item):
+        return item['query']
+
+    def changed_value(self, item):
+        mutated, reason = mutate_query(item.get('query'))
+        if reason:
+            raise ValueError(f"Cannot mutate monitor {item.get('id')}: {reason}")
+        return mutated
+
+    def update_path(self, item):
+        return f"/api/v1/monitor/{item['id']}"
+
+    def broken(self, item):
+        monitor = dict(item, query=self.changed_value(item))
+        thresholds = (item.get('options') or {}).get('thresholds')
+        if thresholds:
+            # Datadog rejects warning and recovery thresholds on the wrong side of the critical one
+            monitor['options'] = dict(item['options'], thresholds={
+                key: value for key, value in thresholds.items() if key not in conflicting_thresholds})
+        return monitor
+
+    def restored(self, item):
+        return item
+
+
+class SyntheticTestStrategy(DrillStrategy):
+    """Point a synthetic test at an invalid URL and trigger a run after every change."""
+
+    original_column = 'OriginalMonitorURL'
+    changed_column = 'ChangedMonitorURL'
+
+    def identify(self, item):
+        return item.get('monitor_id'), item.get('name'), item.get('public_id')
+
+    def skip_reason(self, item, synthetic_monitors=None):
+        reason = super().skip_reason(item)
+        if reason:
+            return reason
+        # A test whose monitor was not in the monitor list has its state checked when drilled
+        state, muted = (synthetic_monitors or {}).get(item['monitor_id'], (None, False))
+        reason = monitor_state_reason(state, muted)
+        if reason:
+            return reason
+        if item.get('status') == 'paused':
+            return 'Test is paused'
+        if not ((item.get('config') or {}).get('request') or {}).get('url'):
+            return 'Test has no request URL to break'
+        return None
+
+    def original_value(self, item):
+        return item['config']['request']['url']
+
+    def changed_value(self, item):
+        return invalid_test_url
+
+    def update_path(self, item):
+        return f"/api/v1/synthetics/tests/{item['public_id']}"
+
+    def broken(self, item):
+        test = self.restored(item)
+        test['config']['request']['url'] = self.changed_value(item)
+        return test
+
+    def restored(self, item):
+        return remove_unnecessary_fields(copy.deepcopy(item))
+
+    async def trigger(self, engine, item):
+        await trigger_synthetic_test(engine, item['public_id'], item['name'])
+
+
+class ApiTestStrategy(SyntheticTestStrategy):
+    monitor_type = 'API'
+    label = 'API test'
+
+
+class BrowserTestStrategy(SyntheticTestStrategy):
+    monitor_type = 'Browser'
+    label = 'Browser test'
+
+    def restored(self, item):
+        test = super().restored(item)
+        # Remove unnecessary nested fields
+        if 'config' in test and 'request' in test['config']:
+            test['config']['request'].pop('public_id', None)
+        return test
+
+
+# Strategies by monitor type, and by synthetic test type for items from the synthetics list
+strategies = {strategy.monitor_type: strategy
+              for strategy in (StandardMonitorStrategy(), ApiTestStrategy(), BrowserTestStrategy())}
+synthetic_strategies = {'api': strategies['API'], 'browser': strategies['Browser']}
+
+
+def strategy_for(item):
+    """Return the strategy that drills item, or None for synthetic test types without one."""
+    if 'public_id' in item:
+        return synthetic_strategies.get(item.get('type'))
+    return strategies['Standard']
+
+
+def combined_fieldnames(drill_strategies):
+    """Return the result columns of several strategies, in order and without repeats."""
+    fieldnames = []
+    for strategy in drill_strategies:
+        fieldnames.extend(field for field in strategy.csv_fieldnames if field not in fieldnames)
+    return fieldnames
+
+
+async def drill(engine, strategy, item):
+    """Simulate a failure in the item through its strategy, then revert it."""
+    monitor_id, name, resource_id = strategy.identify(item)
+    monitor_type, label = strategy.monitor_type, strategy.label
+
+    if not monitor_id or not name or not resource_id:
+        print(f"Skipping {label} due to missing required fields.")
+        return
+
+    # Pick up where an earlier, interrupted run left this monitor
+    saved = engine.checkpoint.load(monitor_id)
+    phase = saved['phase'] if saved else 'new'
+    if phase == 'done':
+        print(f"{label} '{name}' was already drilled in an earlier run. Skipping...")
+        return
+    if phase != 'new':
+        print(f"Resuming {label}: {name} (ID: {resource_id}) at phase '{phase}'")
+        item = saved['item']
+        csv_row = saved['row']
+    else:
+        print(f"Handling {label}: {name} (ID: {resource_id})")
+
+    try:
+        broken_item = strategy.broken(item)
+    except ValueError as exc:
+        print(f"Skipping {label} '{name}': {exc}")
+        return
+
+    # Estimate when the monitor should change state once it has been modified, and once it has been restored,
+    # and how long to wait for each change
+    alert_window = expected_transition_window(broken_item)
+    transition_window = expected_transition_window(item)
+    alert_budget = wait_budget(broken_item, alert_window)
+    ok_budget = wait_budget(item, transition_window)
+    mutated_at = reverted_at = None
+
+    if phase == 'new' and engine.stop_reason is not None:
+        # Not recorded here; whoever takes over the work drills the monitor
+        return
+
+    if phase == 'new' and not engine.has_time_for(expected_drill_seconds(item)):
+        # Leave the monitor untouched, and unmarked in the checkpoint, for a later run
+        engine.record_result(monitor_id, {
+            'MonitorType': monitor_type,
+            'MonitorName': name,
+            'MonitorID': monitor_id,
+            'Remarks': 'Skipped: not enough time left before the drill deadline',
+        })
+        print(f"Skipping {label} '{name}': not enough time left before the drill deadline.")
+        return
+
+    if phase == 'new':
+        # Initialize CSV row
+        csv_row = dict.fromkeys(strategy.csv_fieldnames, '')
+        csv_row.update({
+            'MonitorType': monitor_type,
+            'MonitorName': name,
+            'MonitorID': monitor_id,
+            strategy.original_column: strategy.original_value(item),
+        })
+        engine.record_result(monitor_id, csv_row)
+
+        # Check initial monitor state
+        initial_state, initial_state_time, _ = await wait_for_state(
+            engine, monitor_id, 'OK', max_wait_time=engine.wait_budget(initial_check_budget))
+
+        if initial_state != 'OK':
+            csv_row['Remarks'] = 'Monitor not in OK state initially'
+            engine.record_result(monitor_id, csv_row)
+            engine.checkpoint.save(monitor_id, monitor_type, 'done')
+            print(f"{label} '{name}' is not in an OK state. Skipping...")
+            return
+
+        # Save to CSV before modification
+        csv_row[strategy.changed_column] = strategy.changed_value(item)
+        engine.record_result(monitor_id, csv_row)
+
+    # Hold an alert slot from the mutation until the revert has been sent
+    async with engine.alert_phase() as alert_phase:
+        if phase == 'new' and engine.stop_reason is not None:
+            csv_row['Remarks'] = f"Skipped: {engine.stop_reason}"
+            engine.record_result(monitor_id, csv_row)
+            print(f"Skipping {label} '{name}' before changing it: {engine.stop_reason}")
+            return
+
+        if phase == 'new' and not engine.has_time_for(expected_drill_seconds(item)):
+            # The initial check and the wait for an alert slot can use up the time left, so check again
+            csv_row['Remarks'] = 'Skipped: not enough time left before the drill deadline'
+            engine.record_result(monitor_id, csv_row)
+            print(f"Skipping {label} '{name}' before changing it: not enough time left before the drill deadline.")
+            return
+
+        if phase == 'mutating':
+            # Killed around the mutation, which may or may not have been sent: revert without breaking it again
+            csv_row['Remarks'] = 'Drill interrupted while changing the monitor; reverted'
+            engine.record_result(monitor_id, csv_row)
+            print(f"{label} '{name}' may have been left changed by the interrupted run. Reverting...")
+
+        if phase == 'new':
+            # Keep the original configuration on disk before the monitor is changed
+            engine.checkpoint.save(monitor_id, monitor_type, 'mutating', item=item, row=csv_row)
+
+            # Update the monitor with the broken configuration to force an alert
+            mutation_started = time.monotonic()
+            update_response = await engine.put(strategy.update_path(item), json=broken_item)
+            mutated_at = time.monotonic()
+            engine.metrics.record(monitor_id, monitor_type, name, 'mutation', mutated_at - mutation_started)
+
+            if update_response.status_code != 200:
+                csv_row['Remarks'] = 'Error updating the monitor'
+                engine.record_result(monitor_id, csv_row)
+                engine.checkpoint.save(monitor_id, monitor_type, 'done')
+                print(f"Error updating {label} '{name}' for failure simulation: {update_response.status_code} - {update_response.text}")
+                return
+
+            engine.checkpoint.save(monitor_id, monitor_type, 'alert_wait')
+            await strategy.trigger(engine, item)
+            print(f"{label} '{name}' updated to simulate failure. Waiting for it to enter Alert state...")
+
+        if phase in ('new', 'alert_wait'):
+            # Wait until the monitor enters the Alert state
+            alert_state, alert_state_time, recipients = await wait_for_state(
+                engine, monitor_id, 'Alert', item.get('message'), max_wait_time=engine.wait_budget(alert_budget),
+                transition_window=alert_window)
+
+            if alert_state != 'Alert':
+                # Still revert below, so a monitor that never alerted is not left broken
+                csv_row['Remarks'] = 'Monitor did not enter ALERT state'
+                engine.record_result(monitor_id, csv_row)
+                print(f"{label} '{name}' did not enter the Alert state within the expected time. Reverting...")
+            else:
+                if mutated_at is not None:
+                    engine.metrics.record(monitor_id, monitor_type, name, 'time_to_alert', time.monotonic() - mutated_at)
+                print(f"{label} '{name}' is now in Alert state. Reverting to original configuration...")
+
+                # Save to CSV after entering Alert state
+                csv_row['MonitorAlertState'] = 'Alert'
+                csv_row['MonitorAlertStateTime'] = alert_state_time
+                csv_row['Recipient'] = ', '.join(recipients) if recipients else 'No recipients found'
+                engine.record_result(monitor_id, csv_row)
+
+        if pending(phase, 'reverting'):
+            engine.checkpoint.save(monitor_id, monitor_type, 'reverting', row=csv_row)
+
+            # Revert the monitor to the original configuration
+            revert_started = time.monotonic()
+            revert_response = await engine.put(strategy.update_path(item), json=strategy.restored(item))
+            reverted_at = time.monotonic()
+            engine.metrics.record(monitor_id, monitor_type, name, 'revert', reverted_at - revert_started)
+            alert_phase.release()
+
+            if revert_response.status_code != 200:
+                csv_row['Remarks'] = 'Error reverting the monitor'
+                engine.record_result(monitor_id, csv_row)
+                engine.checkpoint.save(monitor_id, monitor_type, 'done', row=csv_row)
+                print(f"Error reverting {label} '{name}': {revert_response.status_code} - {revert_response.text}")
+                return
+
+            engine.checkpoint.save(monitor_id, monitor_type, 'ok_wait')
+            print(f"Reverted {label} '{name}' to its original configuration.")
+
+            # Run the check again to bring it back online
+            await strategy.trigger(engine, item)
+
+    if csv_row['MonitorAlertState'] != 'Alert':
+        # Never alerted, so there is no recovery to wait for
+        engine.checkpoint.save(monitor_id, monitor_type, 'done', row=csv_row)
+        return
+
+    # Wait until the monitor returns to the OK state
+    ok_state, ok_state_time, _ = await wait_for_state(
+        engine, monitor_id, 'OK', max_wait_time=engine.wait_budget(ok_budget), transition_window=transition_window)
+
+    if ok_state == 'OK':
+        if reverted_at is not None:
+            engine.metrics.record(monitor_id, monitor_type, name, 'time_to_ok', time.monotonic() - reverted_at)
+        print(f"{label} '{name}' is now back to OK state.")
+        csv_row['MonitorOkState'] = 'OK'
+        csv_row['MonitorAlertOKStateTime'] = ok_state_time
+        csv_row['Remarks'] = 'Monitor reverted and back to OK state'
+        engine.record_result(monitor_id, csv_row)
+    else:
+        csv_row['Remarks'] = 'Monitor did not return to OK state'
+        engine.record_result(monitor_id, csv_row)
+        print(f"{label} '{name}' did not return to OK state within the expected time.")
+    engine.checkpoint.save(monitor_id, monitor_type, 'done', row=csv_row)
+
+
+async def drill_any(engine, item):
+    """Drill a monitor or synthetic test with the strategy for its type."""
+    strategy = strategy_for(item)
+    if strategy is None:
+        print(f"Skipping synthetic test '{item.get('name')}' of unsupported type '{item.get('type')}'.")
+        return
+    await drill(engine, strategy, item)
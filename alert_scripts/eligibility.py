@@ -0,0 +1,60 @@
+from drill_strategies import strategy_for
+
+
+class EligibilityFilter:
+    """Drop monitors that cannot be drilled before they reach the drill scheduler.
+
+    Every discovered item is classified from list responses alone (state,
+    mute, query shape, monitor mapping) by its strategy's skip_reason();
+    synthetic tests are judged by the state and mute of their monitor in
+    the monitor list. Skipped items get their result row straight away instead
+    of holding a drill slot through a wait that is bound to time out.
+    """
+
+    def __init__(self, engine, synthetic_monitors=None):
+        self.engine = engine
+        # monitor ID -> (overall_state, muted) of the synthetic monitors seen in the monitor list
+        self.synthetic_monitors = {} if synthetic_monitors is None else synthetic_monitors
+        self.eligible = 0
+        self.skipped = {}
+
+    def skip_reason(self, item):
+        strategy = strategy_for(item)
+        if strategy is None:
+            return None, f"Unsupported synthetic test type '{item.get('type')}'"
+        return strategy, strategy.skip_reason(item, self.synthetic_monitors)
+
+    async def filter(self, items):
+        """Yield the drillable items of a stream (async or not), recording why the others were skipped."""
+        if not hasattr(items, '__aiter__'):
+            items = _aiter(items)
+        async for item in items:
+            strategy, reason = self.skip_reason(item)
+            if reason is None:
+                self.eligible += 1
+                yield item
+            else:
+                self.record_skip(item, strategy, reason)
+
+    def record_skip(self, item, strategy, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        monitor_id = item.get('monitor_id') if 'public_id' in item else item.get('id')
+        # A monitor handled by an interrupted run being resumed keeps the row it already has
+        if monitor_id and self.engine.checkpoint.load(monitor_id) is None:
+            self.engine.record_result(monitor_id, {
+                'MonitorType': strategy.monitor_type if strategy else 'Synthetic',
+                'MonitorName': item.get('name'),
+                'MonitorID': monitor_id,
+                'Remarks': f"Skipped: {reason}",
+            })
+
+    def print_summary(self):
+        skipped = sum(self.skipped.values())
+        print(f"{self.eligible} monitor(s) eligible for the drill, {skipped} skipped.")
+        for reason, count in sorted(self.skipped.items(), key=lambda entry: -entry[1]):
+            print(f"  {count:>8}  {reason}")
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
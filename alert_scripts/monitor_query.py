@@ -0,0 +1,71 @@
+import re
+
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# avg(last_15m):..., or .last("15m") / .last('1h') in log, event and formula queries
+_WINDOW_PATTERNS = [
+    re.compile(r'\blast_(\d+)([smhdw])\b'),
+    re.compile(r'\.last\(\s*["\'](\d+)([smhdw])["\']\s*\)'),
+]
+
+
+def evaluation_window_seconds(query):
+    """Return the evaluation window of a monitor query in seconds, or None if it has none."""
+    if not query:
+        return None
+    for pattern in _WINDOW_PATTERNS:
+        match = pattern.search(query)
+        if match:
+            return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    return None
+
+
+def evaluation_frequency_seconds(window):
+    """Approximate how often Datadog evaluates a monitor with the given evaluation window.
+
+    Monitors with windows of up to a day are evaluated every minute; longer
+    windows are evaluated hourly.
+    """
+    if window is None or window <= 86400:
+        return 60
+    return 3600
+
+
+# The threshold comparison that ends a monitor query, e.g. "... by {host} >= 90"
+_THRESHOLD_PATTERN = re.compile(r'(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\s*$')
+
+# Comparator that holds exactly when the original does not, so an OK monitor alerts on its next evaluation
+_NEGATED_COMPARATORS = {'>': '<=', '>=': '<', '<': '>=', '<=': '>'}
+
+# Functions whose monitors Datadog only accepts with a fixed comparator and threshold, e.g. anomalies(...) >= 1;
+# change() and pct_change() monitors accept every comparator, so those are negated like any other query
+_FIXED_THRESHOLD_FUNCTIONS = re.compile(r'\b(anomalies|forecast|outliers)\s*\(')
+
+
+def parse_threshold(query):
+    """Return (comparator, threshold text, index where the comparison starts) of a query, or None."""
+    if not query:
+        return None
+    match = _THRESHOLD_PATTERN.search(query)
+    if match is None:
+        return None
+    return match.group(1), match.group(2), match.start()
+
+
+def mutate_query(query):
+    """Return (mutated query, None) for a query that will alert on its next evaluation, or (None, reason).
+
+    Only the trailing threshold comparison is negated, so comparisons inside
+    tag filters or formulas are left alone, and the evaluation window is
+    kept: a shorter window could stay OK under the negated comparison too.
+    Anomaly, forecast and outlier queries are refused, since Datadog rejects
+    any other comparison.
+    """
+    parsed = parse_threshold(query)
+    if parsed is None:
+        return None, 'Query has no trailing threshold comparison'
+    fixed = _FIXED_THRESHOLD_FUNCTIONS.search(query)
+    if fixed:
+        return None, f"{fixed.group(1)}() monitors have a fixed threshold comparison"
+    comparator, threshold, start = parsed
+    return f"{query[:start].rstrip()} {_NEGATED_COMPARATORS[comparator]} {threshold}", None
@@ -0,0 +1,99 @@
+import csv
+import json
+import os
+import threading
+import time
+
+
+class ResultJournal:
+    """Thread-safe, append-only journal of result row updates.
+
+    Every call to record() appends one JSON line instead of rewriting the
+    results CSV, so a write costs O(1) however many monitors are in the run.
+    Writes are buffered and fsync'd at most every fsync_interval seconds;
+    compact() folds the journal into the final CSV once the run is over.
+    """
+
+    def __init__(self, filename, fieldnames, fsync_interval=5, buffer_size=1024 * 1024):
+        self.filename = filename
+        self.fieldnames = list(fieldnames)
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_sync = 0
+
+    def open(self, mode='w'):
+        """Open the journal, truncating any previous run unless mode is 'a'."""
+        with self._lock:
+            if self._file is None:
+                self._open(mode)
+
+    def record(self, monitor_id, updated_data):
+        """Append an update to the row of a specific monitor ID."""
+        line = json.dumps({'MonitorID': str(monitor_id), 'data': updated_data}, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open('a')
+            self._file.write(line)
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def close(self):
+        """Flush and fsync outstanding writes and close the journal."""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def rows(self):
+        """Replay the journal and return the latest version of every row, in first-seen order."""
+        rows = {}
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A torn final line from a crash; everything before it is intact.
+                    rows.setdefault(entry['MonitorID'], {}).update(entry['data'])
+        except FileNotFoundError:
+            pass
+        return list(rows.values())
+
+    def compact(self, csv_filename):
+        """Write the folded journal to csv_filename with the configured columns."""
+        self.close()
+        temp_filename = f"{csv_filename}.tmp"
+        with open(temp_filename, mode='w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames, restval='', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.rows())
+        os.replace(temp_filename, csv_filename)
+
+    def _open(self, mode):
+        torn = mode == 'a' and not _ends_with_newline(self.filename)
+        self._file = open(self.filename, mode, encoding='utf-8', buffering=self.buffer_size)
+        if torn:
+            # End a line torn by a crash, so the first new update does not run into it
+            self._file.write("\n")
+        self._last_sync = time.monotonic()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+
+def _ends_with_newline(filename):
+    """Return True if filename is missing, empty or ends with a newline."""
+    try:
+        with open(filename, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                return True
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+    except FileNotFoundError:
+        return True
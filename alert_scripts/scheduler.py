@@ -0,0 +1,83 @@
+import asyncio
+
+_STOP = object()
+
+
+class DrillScheduler:
+    """Run drill coroutines through a fixed pool of worker tasks fed from a bounded queue.
+
+    submit() waits once max_queue_size items are queued, so neither the
+    number of running drills nor the number of monitor dicts held in memory
+    grows with the size of the account.
+    """
+
+    def __init__(self, drill, max_workers=50, max_queue_size=None, progress_interval=60):
+        self.drill = drill
+        self.max_workers = max_workers
+        self.progress_interval = progress_interval
+        self._queue = asyncio.Queue(maxsize=max_queue_size if max_queue_size is not None else max_workers * 2)
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._workers = []
+        self._reporter = None
+
+    def start(self):
+        """Start the worker tasks and the progress reporter on the running event loop."""
+        loop = asyncio.get_running_loop()
+        for _ in range(self.max_workers):
+            self._workers.append(loop.create_task(self._work()))
+        if self.progress_interval:
+            self._reporter = loop.create_task(self._report())
+
+    async def submit(self, item):
+        """Queue an item for drilling, waiting while the queue is full."""
+        if not self._workers:
+            self.start()
+        await self._queue.put(item)
+
+    async def join(self):
+        """Wait for every queued drill to finish and stop the workers."""
+        for _ in self._workers:
+            await self._queue.put(_STOP)
+        await asyncio.gather(*self._workers)
+        self._workers = []
+        if self._reporter is not None:
+            self._reporter.cancel()
+            self._reporter = None
+        self.print_progress()
+
+    def stats(self):
+        """Return the current queue depth and in-flight/completed/failed counts."""
+        return {
+            'queued': self._queue.qsize(),
+            'in_flight': self._in_flight,
+            'completed': self._completed,
+            'failed': self._failed,
+        }
+
+    def print_progress(self):
+        stats = self.stats()
+        print(f"Drill progress: {stats['queued']} queued, {stats['in_flight']} in flight, "
+              f"{stats['completed']} completed, {stats['failed']} failed")
+
+    async def _work(self):
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            self._in_flight += 1
+            try:
+                await self.drill(item)
+            except Exception as exc:
+                print(f"Drill failed with an unexpected error: {exc}")
+                self._failed += 1
+            else:
+                self._completed += 1
+            finally:
+                self._in_flight -= 1
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self.print_progress()
@@ -0,0 +1,114 @@
+import csv
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+
+def shard_of(monitor_id, shard_count):
+    """Return the shard (0 .. shard_count - 1) that drills a monitor, the same on every host."""
+    return zlib.crc32(str(monitor_id).encode('utf-8')) % shard_count
+
+
+def shard_filename(filename, shard_index, shard_count):
+    """Return the per-shard variant of an output file, e.g. results.shard-2-of-8.csv."""
+    root, extension = os.path.splitext(filename)
+    return f"{root}.shard-{shard_index}-of-{shard_count}{extension}"
+
+
+class ShardLeases:
+    """Leases on shard numbers in a SQLite file on storage every runner can reach.
+
+    A runner holds a shard for lease_seconds and has to renew it before it
+    runs out, so two runners never drill the same shard at once, and a shard
+    whose runner died can be taken over once its lease has expired. Finished
+    shards stay marked so no runner drills them again; delete the file to
+    start a new sharded run. Methods may be called from any thread, one at a
+    time, so renewals can run off the event loop.
+    """
+
+    def __init__(self, filename, lease_seconds=300):
+        self.filename = filename
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            # Every write takes the database lock up front so concurrent runners serialize their claims
+            self._db = sqlite3.connect(self.filename, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS shard_leases (
+                    shard_count INTEGER NOT NULL,
+                    shard_index INTEGER NOT NULL,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    finished INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (shard_count, shard_index)
+                )""")
+        return self._db
+
+    def acquire(self, shard_index, shard_count):
+        """Take or renew the lease on a shard; return False if another runner holds it or it is finished."""
+        with self._lock:
+            db = self._connect()
+            now = time.time()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                found = db.execute("SELECT owner, expires_at, finished FROM shard_leases "
+                                   "WHERE shard_count = ? AND shard_index = ?", (shard_count, shard_index)).fetchone()
+                if found is not None and (found[2] or (found[0] != self.owner and found[1] > now)):
+                    db.execute("ROLLBACK")
+                    return False
+                db.execute("INSERT OR REPLACE INTO shard_leases (shard_count, shard_index, owner, expires_at) "
+                           "VALUES (?, ?, ?, ?)", (shard_count, shard_index, self.owner, now + self.lease_seconds))
+                db.execute("COMMIT")
+                return True
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def acquire_any(self, shard_count):
+        """Take the lease on the first free shard and return its index, or None if all are taken."""
+        for shard_index in range(shard_count):
+            if self.acquire(shard_index, shard_count):
+                return shard_index
+        return None
+
+    def finish(self, shard_index, shard_count):
+        """Mark a shard this runner holds as drilled."""
+        with self._lock:
+            self._connect().execute("UPDATE shard_leases SET finished = 1 "
+                                    "WHERE shard_count = ? AND shard_index = ? AND owner = ?",
+                                    (shard_count, shard_index, self.owner))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def merge_results(csv_filename, shard_count, fieldnames):
+    """Combine the per-shard result CSVs into csv_filename; return the shards that were missing.
+
+    csv_filename is left untouched unless every shard's CSV is there.
+    """
+    shard_filenames = [shard_filename(csv_filename, shard_index, shard_count) for shard_index in range(shard_count)]
+    missing = [shard_index for shard_index, filename in enumerate(shard_filenames) if not os.path.exists(filename)]
+    if missing:
+        return missing
+
+    temp_filename = f"{csv_filename}.tmp"
+    with open(temp_filename, mode='w', newline='') as output:
+        writer = csv.DictWriter(output, fieldnames=fieldnames, restval='', extrasaction='ignore')
+        writer.writeheader()
+        for filename in shard_filenames:
+            with open(filename, newline='') as shard:
+                writer.writerows(csv.DictReader(shard))
+    os.replace(temp_filename, csv_filename)
+    return missing
@@ -0,0 +1,118 @@
+import asyncio
+
+
+class _Waiter:
+    """A drill waiting for a monitor to reach a given state."""
+
+    def __init__(self, desired_state, future, schedule, started):
+        self.desired_state = desired_state
+        self.future = future
+        self.schedule = schedule
+        self.started = started
+        self.next_poll_at = started
+
+
+class StatePoller:
+    """Poll the state of every in-flight monitor with one bulk fetch per tick.
+
+    Drills await wait_for_state() and are resumed as soon as a tick sees
+    their monitor in the desired state, so the number of API calls per tick
+    depends on the poller, not on how many monitors are being waited on.
+
+    Each tick only fetches monitors that are due. A waiter without a
+    schedule is due every polling_interval seconds; a waiter with a
+    PollSchedule is due whenever its schedule says so, checked every
+    tick_interval seconds. notify() resumes waiters straight away when the
+    state is pushed by some other source, such as a webhook.
+    """
+
+    def __init__(self, fetch_states, polling_interval=10, tick_interval=None):
+        # fetch_states(monitor_ids) is a coroutine returning {monitor_id (str): state}
+        self.fetch_states = fetch_states
+        self.polling_interval = polling_interval
+        self.tick_interval = tick_interval or polling_interval
+        self._waiters = {}
+        self._task = None
+
+    def start(self):
+        """Start the polling task on the running event loop if it is not already running."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the polling task and release anyone still waiting."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for waiting in self._waiters.values():
+            for waiter in waiting:
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+        self._waiters.clear()
+
+    async def wait_for_state(self, monitor_id, desired_state, max_wait_time=600, schedule=None):
+        """Wait until the monitor enters desired_state; return the state, or None on timeout."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        key = str(monitor_id)
+        waiter = _Waiter(desired_state, loop.create_future(), schedule, loop.time())
+        self._waiters.setdefault(key, []).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter.future, max_wait_time)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._remove_waiter(key, waiter)
+
+    def notify(self, monitor_id, state):
+        """Resume drills waiting for monitor_id to enter state, without waiting for a poll."""
+        for waiter in self._waiters.get(str(monitor_id), []):
+            if not waiter.future.done() and waiter.desired_state == state:
+                waiter.future.set_result(state)
+
+    def in_flight(self):
+        """Return the number of monitors currently being waited on."""
+        return len(self._waiters)
+
+    def _remove_waiter(self, key, waiter):
+        waiting = self._waiters.get(key)
+        if waiting and waiter in waiting:
+            waiting.remove(waiter)
+            if not waiting:
+                del self._waiters[key]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            monitor_ids = [
+                key for key, waiting in self._waiters.items()
+                if any(waiter.next_poll_at <= now for waiter in waiting)
+            ]
+            if monitor_ids:
+                await self._poll(monitor_ids)
+            await asyncio.sleep(self.tick_interval)
+
+    async def _poll(self, monitor_ids):
+        try:
+            states = await self.fetch_states(monitor_ids)
+        except Exception as exc:
+            print(f"Failed to poll monitor states: {exc}")
+            return
+
+        now = asyncio.get_running_loop().time()
+        for key in monitor_ids:
+            state = states.get(key)
+            for waiter in self._waiters.get(key, []):
+                if waiter.future.done():
+                    continue
+                if state == waiter.desired_state:
+                    waiter.future.set_result(state)
+                elif waiter.schedule is not None:
+                    waiter.next_poll_at = now + waiter.schedule.next_delay(now - waiter.started)
+                else:
+                    waiter.next_poll_at = now + self.polling_interval
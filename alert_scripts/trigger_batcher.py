@@ -0,0 +1,70 @@
+import asyncio
+
+trigger_path = "/api/v1/synthetics/tests/trigger"
+
+
+class TriggerBatcher:
+    """Trigger synthetic tests in bulk with one POST per batch.
+
+    Drills await trigger() and their test is added to the pending batch,
+    which is sent batch_window seconds after its first test arrived or as
+    soon as it holds max_batch_size tests. Each caller gets back the shared
+    response together with the results for its own test.
+    """
+
+    def __init__(self, post, batch_window=0.5, max_batch_size=100):
+        # post(path, json=...) is a coroutine returning an ApiResponse
+        self.post = post
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.batches_sent = 0
+        self._pending = {}
+        self._timer = None
+        self._sending = set()
+
+    async def trigger(self, public_id):
+        """Trigger one test; return (response, the test's entries in the response's results)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(public_id, []).append(future)
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    async def close(self):
+        """Send whatever is pending and wait for every batch in flight."""
+        self._flush()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        self.batches_sent += 1
+        try:
+            response = await self.post(trigger_path, json={"tests": [{"public_id": public_id} for public_id in batch]})
+        except Exception as exc:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+
+        results = {}
+        if response.status_code == 200:
+            for result in response.json().get('results', []):
+                results.setdefault(result.get('public_id'), []).append(result)
+        for public_id, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result((response, results.get(public_id, [])))
@@ -0,0 +1,103 @@
+import asyncio
+import re
+
+from adaptive_polling import expected_drill_seconds
+
+_recipient_pattern = re.compile(r'@[\w.+\-@]+')
+
+
+def wave_group(monitor, group_by):
+    """Return the wave group of a monitor: a recipient handle, or the value of the group_by tag key."""
+    if group_by == 'recipient':
+        match = _recipient_pattern.search(monitor.get('message') or '')
+        return match.group(0) if match else 'no recipient'
+
+    prefix = f"{group_by}:"
+    for tag in monitor.get('tags') or []:
+        if tag.startswith(prefix):
+            return tag[len(prefix):]
+    return f"no {group_by}"
+
+
+class WaveRollout:
+    """Move monitors through the drill in waves of related monitors.
+
+    Monitors are grouped by a tag key (team, service, ...) or by recipient
+    and packed into waves of about wave_size, keeping each group together
+    where it fits so one team is paged in one burst rather than all day.
+    A wave is released once the previous one has finished or wave_interval
+    seconds after it started, whichever comes first, so waves overlap while
+    the engine's alert cap bounds how many monitors alert at once. With
+    quickest_first, as for runs with a deadline, every wave drills its
+    quickest items first and quicker waves go first.
+    """
+
+    def __init__(self, group_by='team', wave_size=100, max_alerting=200, wave_interval=300, quickest_first=False):
+        self.group_by = group_by
+        self.wave_size = wave_size
+        self.max_alerting = max_alerting
+        self.wave_interval = wave_interval
+        self.quickest_first = quickest_first
+
+    def plan(self, items):
+        """Return the waves as a list of (group names, items) in rollout order."""
+        groups = {}
+        for item in items:
+            groups.setdefault(wave_group(item, self.group_by), []).append(item)
+
+        waves = []
+        names, wave = [], []
+        for name, members in groups.items():
+            if wave and len(wave) + len(members) > self.wave_size:
+                waves.append((names, wave))
+                names, wave = [], []
+            for start in range(0, len(members), self.wave_size):
+                chunk = members[start:start + self.wave_size]
+                if wave and len(wave) + len(chunk) > self.wave_size:
+                    waves.append((names, wave))
+                    names, wave = [], []
+                names.append(name)
+                wave.extend(chunk)
+        if wave:
+            waves.append((names, wave))
+        if self.quickest_first:
+            waves = [(names, sorted(wave, key=expected_drill_seconds)) for names, wave in waves]
+            waves.sort(key=lambda entry: sum(map(expected_drill_seconds, entry[1])) / len(entry[1]))
+        return waves
+
+    async def run(self, engine, items, drill):
+        """Drill items wave by wave through the engine and return the number of items drilled.
+
+        Grouping needs every monitor up front, so an async discovery stream is
+        collected before the first wave starts.
+        """
+        if hasattr(items, '__aiter__'):
+            items = [item async for item in items]
+        waves = self.plan(items)
+        engine.limit_alerting(self.max_alerting)
+
+        remaining = [len(wave) for _, wave in waves]
+        finished = [asyncio.Event() for _ in waves]
+
+        async def drill_in_wave(engine, entry):
+            index, item = entry
+            try:
+                await drill(engine, item)
+            finally:
+                remaining[index] -= 1
+                if not remaining[index]:
+                    finished[index].set()
+
+        async def release_waves():
+            for index, (names, wave) in enumerate(waves):
+                if index:
+                    try:
+                        await asyncio.wait_for(finished[index - 1].wait(), self.wave_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                shown = ', '.join(names[:5]) + (f" and {len(names) - 5} more" if len(names) > 5 else "")
+                print(f"Starting wave {index + 1}/{len(waves)}: {len(wave)} monitors ({shown})")
+                for item in wave:
+                    yield index, item
+
+        return await engine.run(release_waves(), drill_in_wave)
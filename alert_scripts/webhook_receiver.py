@@ -0,0 +1,155 @@
+import argparse
+import hmac
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Header carrying the shared token, for webhooks that cannot put it in the URL path
+token_header = 'X-Drill-Token'
+
+# Payload for the Datadog webhook integration; add "@webhook-<name>" to the monitors being drilled
+payload_template = {
+    "monitor_id": "$ALERT_ID",
+    "transition": "$ALERT_TRANSITION",
+    "alert_type": "$ALERT_TYPE",
+    "date": "$DATE",
+}
+
+# Monitor state implied by $ALERT_TRANSITION, and by $ALERT_TYPE when there is no transition
+transition_states = {
+    'triggered': 'Alert',
+    're-triggered': 'Alert',
+    'recovered': 'OK',
+    'warn': 'Warn',
+    're-warn': 'Warn',
+    'no data': 'No Data',
+    're-no data': 'No Data',
+}
+alert_type_states = {'error': 'Alert', 'success': 'OK', 'warning': 'Warn'}
+
+
+def parse_notification(body):
+    """Return (monitor_id, state) from a webhook payload, or None if it names no monitor or state.
+
+    Accepts payload_template as well as payloads using the raw Datadog
+    variable names (alert_id, alert_transition).
+    """
+    if not isinstance(body, dict):
+        return None
+    monitor_id = body.get('monitor_id') or body.get('alert_id') or body.get('id')
+    transition = str(body.get('transition') or body.get('alert_transition') or '').strip().lower()
+    state = transition_states.get(transition) or alert_type_states.get(str(body.get('alert_type') or '').lower())
+    if not monitor_id or not state:
+        return None
+    return str(monitor_id), state
+
+
+class WebhookReceiver:
+    """Local HTTP endpoint for Datadog monitor notification webhooks.
+
+    Every POSTed notification that names a monitor and a transition is
+    handed to on_state(monitor_id, state) on the event loop, so a drill
+    waiting for that state resumes as soon as Datadog notifies instead of
+    at its next poll. A forged notification would record a false Alert, so
+    requests must carry token as the URL path (http://host:port/<token>)
+    or in the X-Drill-Token header; without a token a random one is made
+    and shown by start(). The server runs on a background thread and
+    listens on localhost by default; it is a plain http.server, so put a
+    tunnel or proxy in front of it for Datadog to reach it.
+    """
+
+    def __init__(self, on_state, host='127.0.0.1', port=8127, token=None):
+        self.on_state = on_state
+        self.host = host
+        self.port = port
+        self.token = token or secrets.token_urlsafe(16)
+        self.received = 0
+        self.ignored = 0
+        self.rejected = 0
+        self._loop = None
+        self._server = None
+
+    def start(self, loop=None):
+        """Serve on a background thread; notifications go to on_state on loop, or are called directly without one."""
+        self._loop = loop
+        self._server = _Server((self.host, self.port), _handler_for(self))
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        url = f"http://{self.host}:{self.port}/{self.token}"
+        print(f"Listening for monitor webhooks on {url}")
+        return url
+
+    def authorized(self, path, headers):
+        """Return True if a request carries the token in its path or header."""
+        supplied = headers.get(token_header) or path.split('?', 1)[0].strip('/')
+        return hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8'))
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def dispatch(self, body):
+        """Deliver one decoded payload; return True if it carried a monitor state."""
+        notification = parse_notification(body)
+        if notification is None:
+            self.ignored += 1
+            return False
+        self.received += 1
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.on_state, *notification)
+        else:
+            self.on_state(*notification)
+        return True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def _handler_for(receiver):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw_body = self.rfile.read(length)
+            if not receiver.authorized(self.path, self.headers):
+                receiver.rejected += 1
+                status = 403
+            else:
+                try:
+                    body = json.loads(raw_body or b'null')
+                except ValueError:
+                    body = None
+                status = 202 if receiver.dispatch(body) else 400
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the monitor states carried by incoming Datadog webhooks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8127)
+    parser.add_argument("--token", default=None, help="Shared token expected in the URL path; random by default")
+    args = parser.parse_args()
+
+    receiver = WebhookReceiver(lambda monitor_id, state: print(f"Monitor ID: {monitor_id} -> {state}"),
+                               args.host, args.port, args.token)
+    url = receiver.start()
+    print(f"Webhook payload for the Datadog integration: {json.dumps(payload_template)}")
+    print(f"Try it with: curl -X POST {url} -d '{{\"monitor_id\": \"123\", \"transition\": \"Triggered\"}}'")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from datadog_common.rate_limits import RETRY_STATUSES, RateLimitTracker, backoff_delay
+from datadog_common.request_stats import RequestStats, endpoint_key
+
+
+class ApiResponse:
+    """The parts of an HTTP response the drill scripts look at, read eagerly."""
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncDatadogClient:
+    """Non-blocking counterpart of DatadogClient for the asyncio drill engine.
+
+    Shares the same retry, rate-limit and per-endpoint statistics behaviour,
+    over one pooled aiohttp session, and the same optional ResponseCache.
+    open() must be awaited on the event loop that will use the client.
+    """
+
+    def __init__(self, datadog_url, api_key, app_key, pool_size=100, max_retries=5, timeout=60, cache=None):
+        self.datadog_url = datadog_url.rstrip('/')
+        self.headers = {
+            "DD-API-KEY": api_key,
+            "DD-APPLICATION-KEY": app_key,
+            "Content-Type": "application/json"
+        }
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = RequestStats()
+        self.rate_limits = RateLimitTracker()
+        self.cache = cache
+        self.session = None
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method, path, **kwargs):
+        """Send a request to a Datadog API path and return an ApiResponse, or a CachedResponse."""
+        endpoint = endpoint_key(method, path)
+        cached = None
+        if self.cache is not None and method.upper() == 'GET':
+            cached, fresh = self.cache.lookup(self.datadog_url, path, kwargs.get('params'))
+            if fresh:
+                return cached.response()
+            if cached is not None:
+                kwargs['headers'] = dict(cached.validators(), **(kwargs.get('headers') or {}))
+        started = time.monotonic()
+        attempt = 0
+
+        while True:
+            wait = self.rate_limits.reserve(endpoint)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                async with self.session.request(method, f"{self.datadog_url}{path}", **kwargs) as raw:
+                    response = ApiResponse(raw.status, await raw.text(), raw.headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    self.stats.record(endpoint, time.monotonic() - started, None, attempt)
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.rate_limits.update(endpoint, response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                await asyncio.sleep(self.rate_limits.retry_delay(response.status_code, response.headers, attempt))
+                attempt += 1
+                continue
+
+            self.stats.record(endpoint, time.monotonic() - started, response.status_code, attempt)
+            if self.cache is not None:
+                if method.upper() == 'GET':
+                    revalidated = self.cache.update(self.datadog_url, path, kwargs.get('params'), response.status_code,
+                                                    response.text, response.headers, cached)
+                    if revalidated is not None:
+                        return revalidated.response()
+                elif response.status_code < 400:
+                    self.cache.invalidate(self.datadog_url, path)
+            return response
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request('PUT', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
@@ -0,0 +1,91 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from datadog_common.rate_limits import RETRY_STATUSES, RateLimitTracker, backoff_delay
+from datadog_common.request_stats import RequestStats, endpoint_key
+
+
+class DatadogClient:
+    """Blocking Datadog API client shared by the snapshot and revert scripts.
+
+    Requests go through one pooled keep-alive session. 429 and 5xx responses
+    are retried with jittered backoff, X-RateLimit-* headers are honoured
+    before sending, and per-endpoint counts and latencies are kept in stats.
+    With a ResponseCache, GET responses are reused or revalidated through it.
+    """
+
+    def __init__(self, datadog_url, api_key, app_key, pool_size=20, max_retries=5, timeout=60, cache=None):
+        self.datadog_url = datadog_url.rstrip('/')
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = RequestStats()
+        self.rate_limits = RateLimitTracker()
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers.update({
+            "DD-API-KEY": api_key,
+            "DD-APPLICATION-KEY": app_key,
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, **kwargs):
+        """Send a request to a Datadog API path and return the requests.Response, or a CachedResponse."""
+        endpoint = endpoint_key(method, path)
+        kwargs.setdefault('timeout', self.timeout)
+        cached = None
+        if self.cache is not None and method.upper() == 'GET':
+            cached, fresh = self.cache.lookup(self.datadog_url, path, kwargs.get('params'))
+            if fresh:
+                return cached.response()
+            if cached is not None:
+                kwargs['headers'] = dict(cached.validators(), **(kwargs.get('headers') or {}))
+        started = time.monotonic()
+        attempt = 0
+
+        while True:
+            wait = self.rate_limits.reserve(endpoint)
+            if wait:
+                time.sleep(wait)
+            try:
+                response = self.session.request(method, f"{self.datadog_url}{path}", **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self.stats.record(endpoint, time.monotonic() - started, None, attempt)
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.rate_limits.update(endpoint, response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self.rate_limits.retry_delay(response.status_code, response.headers, attempt))
+                attempt += 1
+                continue
+
+            self.stats.record(endpoint, time.monotonic() - started, response.status_code, attempt)
+            if self.cache is not None:
+                if method.upper() == 'GET':
+                    revalidated = self.cache.update(self.datadog_url, path, kwargs.get('params'), response.status_code,
+                                                    response.text, response.headers, cached)
+                    if revalidated is not None:
+                        return revalidated.response()
+                elif response.status_code < 400:
+                    self.cache.invalidate(self.datadog_url, path)
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Largest page sizes accepted by the monitor and synthetics list endpoints
+monitor_page_size = 1000
+synthetics_page_size = 100
+
+
+def is_synthetic_monitor(monitor):
+    return 'synthetics alert' in monitor.get('type', '').lower()
+
+
+def _monitor_page_request(page, page_size):
+    return "/api/v1/monitor", {"page": page, "page_size": page_size}
+
+
+def _synthetics_page_request(page, page_size):
+    return "/api/v1/synthetics/tests", {"page_number": page, "page_size": page_size}
+
+
+def _page_items(response, what):
+    if response.status_code != 200:
+        print(f"Failed to fetch {what}, Status code: {response.status_code}")
+        print(f"Response: {response.text}")
+        return None
+    body = response.json()
+    return body.get('tests', []) if isinstance(body, dict) else body
+
+
+def _iter_pages(fetch_page, page_size):
+    """Yield items page by page, fetching the next page in the background while the current one is consumed."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = 0
+        future = executor.submit(fetch_page, page)
+        while future is not None:
+            items = future.result()
+            if items is None:
+                return
+            future = None
+            if len(items) >= page_size:
+                page += 1
+                future = executor.submit(fetch_page, page)
+            yield from items
+
+
+async def _aiter_pages(fetch_page, page_size):
+    """Async counterpart of _iter_pages."""
+    page = 0
+    task = asyncio.ensure_future(fetch_page(page))
+    try:
+        while task is not None:
+            items = await task
+            if items is None:
+                return
+            task = None
+            if len(items) >= page_size:
+                page += 1
+                task = asyncio.ensure_future(fetch_page(page))
+            for item in items:
+                yield item
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+def iter_monitors(client, include_synthetics=False, page_size=monitor_page_size):
+    """Yield all monitors from Datadog one page at a time, by default excluding synthetic monitors."""
+    def fetch_page(page):
+        path, params = _monitor_page_request(page, page_size)
+        return _page_items(client.get(path, params=params), "monitors")
+
+    for monitor in _iter_pages(fetch_page, page_size):
+        if include_synthetics or not is_synthetic_monitor(monitor):
+            yield monitor
+
+
+def iter_synthetic_tests(client, test_type=None, page_size=synthetics_page_size):
+    """Yield all synthetic tests from Datadog one page at a time, optionally only those of test_type."""
+    def fetch_page(page):
+        path, params = _synthetics_page_request(page, page_size)
+        return _page_items(client.get(path, params=params), "synthetic tests")
+
+    for test in _iter_pages(fetch_page, page_size):
+        if test_type is None or test.get('type') == test_type:
+            yield test
+
+
+async def aiter_monitors(client, include_synthetics=False, page_size=monitor_page_size):
+    """Async counterpart of iter_monitors for an AsyncDatadogClient."""
+    async def fetch_page(page):
+        path, params = _monitor_page_request(page, page_size)
+        return _page_items(await client.get(path, params=params), "monitors")
+
+    async for monitor in _aiter_pages(fetch_page, page_size):
+        if include_synthetics or not is_synthetic_monitor(monitor):
+            yield monitor
+
+
+async def aiter_synthetic_tests(client, test_type=None, page_size=synthetics_page_size):
+    """Async counterpart of iter_synthetic_tests for an AsyncDatadogClient."""
+    async def fetch_page(page):
+        path, params = _synthetics_page_request(page, page_size)
+        return _page_items(await client.get(path, params=params), "synthetic tests")
+
+    async for test in _aiter_pages(fetch_page, page_size):
+        if test_type is None or test.get('type') == test_type:
+            yield test
@@ -0,0 +1,145 @@
+import bisect
+import json
+import math
+import threading
+
+# Bucket upper bounds in seconds for HTTP request latencies
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Bucket upper bounds in seconds for drill phases, which wait on monitor evaluations
+phase_buckets = (1, 5, 10, 30, 60, 120, 300, 600, 900, 1800, 3600)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values, as exported by Prometheus and OpenMetrics."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative_counts(self):
+        """Return [(upper_bound, observations <= upper_bound)] ending with +Inf."""
+        total = 0
+        cumulative = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        below = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.max
+            if count and below + count >= rank:
+                # Interpolate over the part of the bucket that observations actually fall in
+                low, high = max(lower, self.min), min(upper, self.max)
+                return low + (high - low) * (rank - below) / count
+            below += count
+            lower = upper
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+class MetricsRegistry:
+    """Thread-safe set of labelled histogram families with OpenMetrics text and JSON export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+
+    def register(self, name, help_text, buckets, label_names):
+        """Declare a histogram family; observations must then use exactly label_names."""
+        with self._lock:
+            self._families.setdefault(name, {
+                'help': help_text, 'buckets': buckets, 'label_names': tuple(label_names), 'series': {},
+            })
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            family = self._families[name]
+            key = tuple(str(labels[label]) for label in family['label_names'])
+            histogram = family['series'].get(key)
+            if histogram is None:
+                histogram = family['series'][key] = Histogram(family['buckets'])
+            histogram.observe(value)
+
+    def add_histogram(self, name, histogram, **labels):
+        """Attach an existing histogram (e.g. one kept by RequestStats) as a series of a family."""
+        with self._lock:
+            family = self._families[name]
+            family['series'][tuple(str(labels[label]) for label in family['label_names'])] = histogram
+
+    def to_openmetrics(self):
+        """Render every family in the OpenMetrics text exposition format."""
+        lines = []
+        with self._lock:
+            for name, family in self._families.items():
+                lines.append(f"# TYPE {name} histogram")
+                if name.endswith('_seconds'):
+                    lines.append(f"# UNIT {name} seconds")
+                lines.append(f"# HELP {name} {family['help']}")
+                for key, histogram in sorted(family['series'].items()):
+                    labels = dict(zip(family['label_names'], key))
+                    for bound, total in histogram.cumulative_counts():
+                        bucket_labels = _format_labels(dict(labels, le=_format_value(bound)))
+                        lines.append(f"{name}_bucket{{{bucket_labels}}} {total}")
+                    series_labels = f"{{{_format_labels(labels)}}}" if labels else ""
+                    lines.append(f"{name}_count{series_labels} {histogram.count}")
+                    lines.append(f"{name}_sum{series_labels} {_format_value(histogram.sum)}")
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Return {family: [{labels..., count, sum, min, max, mean, p50, p90, p99}]}."""
+        with self._lock:
+            return {
+                name: [dict(zip(family['label_names'], key), **histogram.summary())
+                       for key, histogram in sorted(family['series'].items())]
+                for name, family in self._families.items()
+            }
+
+    def write_openmetrics(self, filename):
+        with open(filename, 'w') as file:
+            file.write(self.to_openmetrics())
+
+    def write_json(self, filename, extra=None):
+        with open(filename, 'w') as file:
+            json.dump(dict(self.summary(), **(extra or {})), file, indent=4)
@@ -0,0 +1,69 @@
+import random
+import threading
+import time
+
+# Responses worth retrying: rate limited or a transient server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Return a full-jitter exponential backoff delay for the given retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitTracker:
+    """Track Datadog's X-RateLimit-* headers and hold requests back until a limit resets.
+
+    Limits are shared by every endpoint that reports the same
+    X-RateLimit-Name. The remaining budget is decremented locally on each
+    request so that concurrent callers do not all spend the last few calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = {}
+        self._limits = {}
+
+    def reserve(self, endpoint):
+        """Claim one request for the endpoint; return how many seconds to wait before sending it."""
+        with self._lock:
+            name = self._names.get(endpoint, endpoint)
+            limit = self._limits.get(name)
+            if limit is None:
+                return 0.0
+            now = time.monotonic()
+            if now >= limit['reset_at']:
+                del self._limits[name]
+                return 0.0
+            if limit['remaining'] > 0:
+                limit['remaining'] -= 1
+                return 0.0
+            return limit['reset_at'] - now + random.uniform(0, 1)
+
+    def update(self, endpoint, headers):
+        """Record the rate-limit headers of a response."""
+        remaining = _header_number(headers, 'X-RateLimit-Remaining')
+        reset = _header_number(headers, 'X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        name = headers.get('X-RateLimit-Name') or endpoint
+        with self._lock:
+            self._names[endpoint] = name
+            self._limits[name] = {'remaining': int(remaining), 'reset_at': time.monotonic() + reset}
+
+    def retry_delay(self, status_code, headers, attempt):
+        """Return how long to wait before retrying a 429 or 5xx response."""
+        if status_code == 429:
+            wait = _header_number(headers, 'X-RateLimit-Reset')
+            if wait is None:
+                wait = _header_number(headers, 'Retry-After')
+            if wait is not None:
+                return wait + random.uniform(0, 1)
+        return backoff_delay(attempt)
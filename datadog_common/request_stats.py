@@ -0,0 +1,59 @@
+import re
+import threading
+
+from datadog_common.metrics import Histogram, latency_buckets
+
+# Path segments that identify a single monitor or synthetic test
+_ID_SEGMENT = re.compile(r'^(\d+|[a-z0-9]{3}-[a-z0-9]{3}-[a-z0-9]{3})$')
+
+
+def endpoint_key(method, path):
+    """Group a request under its endpoint, e.g. 'PUT /api/v1/monitor/{id}'."""
+    path = path.split('?', 1)[0]
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/')]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+class RequestStats:
+    """Thread-safe per-endpoint request counts and latencies, with a latency histogram per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._latency = {}
+
+    def record(self, endpoint, elapsed, status_code=None, retries=0):
+        """Record one completed request (including any retries it needed)."""
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'count': 0, 'errors': 0, 'retries': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+            })
+            stats['count'] += 1
+            stats['retries'] += retries
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            self._latency.setdefault(endpoint, Histogram(latency_buckets)).observe(elapsed)
+            if status_code is None or status_code >= 400:
+                stats['errors'] += 1
+
+    def summary(self):
+        """Return {endpoint: {count, errors, retries, total_seconds, max_seconds, avg_seconds}}."""
+        with self._lock:
+            return {
+                endpoint: dict(stats, avg_seconds=stats['total_seconds'] / stats['count'])
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def latency_histograms(self):
+        """Return {endpoint: Histogram} of request latencies in seconds."""
+        with self._lock:
+            return dict(self._latency)
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("API requests by endpoint:")
+        for endpoint, stats in sorted(summary.items()):
+            print(f"  {endpoint}: {stats['count']} requests, {stats['errors']} errors, {stats['retries']} retries, "
+                  f"avg {stats['avg_seconds'] * 1000:.0f} ms, max {stats['max_seconds'] * 1000:.0f} ms")
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode, urlparse
+
+from datadog_common.request_stats import endpoint_key
+
+# Seconds a GET response without an ETag or Last-Modified header is reused without asking Datadog again,
+# by endpoint; other endpoints use default_ttl. Monitor states are never reused, only revalidated.
+default_ttl = 30
+endpoint_ttls = {
+    'GET /api/v1/monitor/search': 0,
+}
+
+# Largest total size of the cached response bodies kept in memory and on disk, and largest single body
+# cached; bigger list pages are streamed as before and never held on to
+default_max_bytes = 16 * 1024 * 1024
+default_max_entry_bytes = 1024 * 1024
+
+# Response headers kept with a cached body
+_kept_headers = ('ETag', 'Last-Modified', 'Content-Type')
+
+
+def cache_filename(datadog_url, api_key, prefix='datadog_response_cache'):
+    """Return the cache file of one Datadog site and organization.
+
+    e.g. 'datadog_response_cache.us5.datadoghq.com.1a2b3c4d.json'; the
+    organization is a hash of its API key, so the key is not written out.
+    """
+    site = urlparse(datadog_url).netloc.replace(':', '_') or 'default'
+    return f"{prefix}.{site}.{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]}.json"
+
+
+def cache_key(base_url, path, params=None):
+    """Return the cache key of a GET request, e.g. 'https://us5.datadoghq.com/api/v1/monitor?page=0&page_size=1000'."""
+    if not params:
+        return f"{base_url}{path}"
+    return f"{base_url}{path}?{urlencode(sorted((str(name), str(value)) for name, value in dict(params).items()))}"
+
+
+def _collection(path):
+    """Return the path up to its first ID segment, e.g. '/api/v1/monitor' for '/api/v1/monitor/123'."""
+    segments = path.split('?', 1)[0].split('/')
+    endpoint_segments = endpoint_key('GET', path).split(' ', 1)[1].split('/')
+    if '{id}' in endpoint_segments:
+        segments = segments[:endpoint_segments.index('{id}')]
+    return '/'.join(segments)
+
+
+class CachedResponse:
+    """A 200 response served from the cache, with the same fields as ApiResponse."""
+
+    status_code = 200
+
+    def __init__(self, text, headers):
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class CacheEntry:
+    def __init__(self, text, headers, stored_at, ttl):
+        self.text = text
+        self.headers = headers
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.size = len(text)
+
+    def validators(self):
+        """Return the conditional request headers that revalidate this entry."""
+        headers = {}
+        if self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def is_fresh(self):
+        """Return True if the entry can be served without a request; entries with validators never are."""
+        return not self.validators() and time.time() - self.stored_at < self.ttl
+
+    def response(self):
+        return CachedResponse(self.text, dict(self.headers))
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of GET responses shared by DatadogClient and AsyncDatadogClient.
+
+    Responses carrying an ETag or Last-Modified header are revalidated on
+    every request with If-None-Match / If-Modified-Since, so an unchanged
+    list costs a 304 instead of its full payload. Other responses are
+    reused for their endpoint's TTL, and dropped as soon as a PUT, POST or
+    DELETE touches the same collection. With a filename, revalidatable
+    entries are loaded on first use and written back by save(), so
+    back-to-back runs revalidate the previous run's lists. Keys include the
+    client's base URL, so one cache never answers for another site.
+    """
+
+    def __init__(self, filename=None, max_bytes=default_max_bytes, max_entry_bytes=default_max_entry_bytes,
+                 default_ttl=default_ttl, ttls=None):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(endpoint_ttls if ttls is None else ttls)
+        self.counts = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evicted': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._loaded = filename is None
+
+    def lookup(self, base_url, path, params=None):
+        """Return (entry, fresh) for a GET request: the cached entry or None, and whether it can be served as is."""
+        key = cache_key(base_url, path, params)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counts['misses'] += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = entry.is_fresh()
+            if fresh:
+                self.counts['hits'] += 1
+                self.counts['bytes_saved'] += entry.size
+            return entry, fresh
+
+    def update(self, base_url, path, params, status_code, text, headers, cached=None):
+        """Record the response to a GET request; return the entry to serve instead after a 304, or None.
+
+        cached is the entry lookup() returned for the request, which is kept
+        even if it was evicted while the request was in flight.
+        """
+        key = cache_key(base_url, path, params)
+        with self._lock:
+            if status_code == 304:
+                entry = self._entries.get(key) or cached
+                if entry is None:
+                    return None
+                if key not in self._entries:
+                    self._add(key, entry)
+                entry.stored_at = time.time()
+                entry.headers.update({name: headers[name] for name in ('ETag', 'Last-Modified') if headers.get(name)})
+                self.counts['revalidated'] += 1
+                self.counts['bytes_saved'] += entry.size
+                return entry
+
+            self._remove(key)
+            if status_code == 200:
+                kept = {name: headers.get(name) for name in _kept_headers if headers.get(name)}
+                ttl = self.ttls.get(endpoint_key('GET', path), self.default_ttl)
+                entry = CacheEntry(text, kept, time.time(), ttl)
+                if (entry.validators() or ttl > 0) and entry.size <= min(self.max_entry_bytes, self.max_bytes):
+                    self._add(key, entry)
+            return None
+
+    def invalidate(self, base_url, path):
+        """Drop the TTL entries of the collection a PUT, POST or DELETE to path may have changed.
+
+        Entries with validators stay, since they are revalidated anyway.
+        """
+        collection = f"{base_url}{_collection(path)}"
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if not entry.validators()
+                     and (key == collection or key.startswith((f"{collection}/", f"{collection}?")))]
+            for key in stale:
+                self._remove(key)
+
+    def _add(self, key, entry):
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+            self.counts['evicted'] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.filename) as cache_file:
+                saved = json.load(cache_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable response cache {self.filename}: {e}")
+            return
+        for key, fields in saved.items():
+            entry = CacheEntry(fields['text'], fields['headers'], fields['stored_at'], 0)
+            if entry.validators() and entry.size <= self.max_entry_bytes:
+                self._add(key, entry)
+
+    def save(self):
+        """Write the revalidatable entries to filename for the next run; a failure is reported, never raised.
+
+        Every process writes its own temporary file and swaps it in, so
+        runners finishing together leave one of their caches intact.
+        """
+        if self.filename is None:
+            return
+        with self._lock:
+            self._load()
+            saved = {key: {'text': entry.text, 'headers': entry.headers, 'stored_at': entry.stored_at}
+                     for key, entry in self._entries.items() if entry.validators()}
+        temp_filename = None
+        try:
+            descriptor, temp_filename = tempfile.mkstemp(
+                prefix=f"{os.path.basename(self.filename)}.", suffix='.tmp', dir=os.path.dirname(self.filename) or '.')
+            with os.fdopen(descriptor, 'w') as cache_file:
+                json.dump(saved, cache_file)
+            os.replace(temp_filename, self.filename)
+        except OSError as e:
+            print(f"Could not save the response cache to {self.filename}: {e}")
+            if temp_filename is not None and os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    def print_summary(self):
+        counts = dict(self.counts)
+        if not any(counts[name] for name in ('hits', 'revalidated', 'misses')):
+            return
+        print(f"Response cache: {counts['hits']} served from cache, {counts['revalidated']} revalidated (304), "
+              f"{counts['misses']} not cached, {counts['evicted']} evicted, "
+              f"{counts['bytes_saved'] / (1024 * 1024):.1f} MB not downloaded")
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, 'alert_scripts'))
+sys.path.insert(0, os.path.join(root_dir, 'monitor_lists_and_revert'))
+
+from datadog_common.async_client import AsyncDatadogClient
+from datadog_common.discovery import aiter_monitors
+from drill_engine import DrillEngine
+from drill_strategies import drill, parse_recipients, remove_unnecessary_fields, strategies
+from fake_datadog import FakeDatadog
+from result_journal import ResultJournal
+import drill_all
+import master_revert
+import monitor_lists
+
+default_sizes = [100, 1000, 10000, 50000]
+default_baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# A result slower than its baseline by more than this fraction is a regression
+default_tolerance = 0.5
+
+# Timings below this many seconds are too noisy to compare against a baseline
+min_comparable_seconds = 0.01
+
+# Growth exponent between the smallest and largest fleet above which a hot path counts as superlinear
+max_scaling_exponent = 1.4
+
+# Result row updates per monitor in one drill (created, mutated, alerted, back to OK)
+updates_per_monitor = 4
+
+
+def build_fleet(size):
+    """Return (monitors, synthetic tests) of a synthetic fleet with size monitors and size / 10 tests."""
+    tests = max(1, size // 10)
+    fake = FakeDatadog(monitors=size, api_tests=tests, browser_tests=0)
+    monitors = [monitor for monitor in fake.monitors.values() if monitor['type'] != 'synthetics alert']
+    return monitors, list(fake.tests.values())
+
+
+def bench_update_csv_row(monitors, tests, workdir):
+    csv_filename = os.path.join(workdir, 'results.csv')
+    journal = ResultJournal(f"{csv_filename}.journal", strategies['Standard'].csv_fieldnames)
+    rows = [{'MonitorType': 'Standard', 'MonitorName': monitor['name'], 'MonitorID': monitor['id'],
+             'OriginalMonitorThreshold': monitor['query'], 'Remarks': ''} for monitor in monitors]
+
+    def run():
+        journal.open()
+        for update in range(updates_per_monitor):
+            for row in rows:
+                row['Remarks'] = f"phase {update}"
+                journal.record(row['MonitorID'], row)
+        journal.close()
+        journal.compact(csv_filename)
+    return run
+
+
+def bench_plan_reverts(monitors, tests, workdir):
+    # One monitor in ten drifted from the backup, so the plan is built but no revert request is sent
+    backup = copy.deepcopy(monitors)
+    for monitor in backup[::10]:
+        monitor['query'] = f"{monitor['query']} "
+    return lambda: master_revert.plan_reverts(monitors, backup, "standard monitor")
+
+
+def bench_parse_recipients(monitors, tests, workdir):
+    messages = [monitor['message'] for monitor in monitors]
+    return lambda: [parse_recipients(message) for message in messages]
+
+
+def bench_remove_unnecessary_fields(monitors, tests, workdir):
+    copies = [copy.deepcopy(tests[index % len(tests)]) for index in range(len(monitors))]
+    return lambda: [remove_unnecessary_fields(dict(test)) for test in copies]
+
+
+def bench_save_to_json(monitors, tests, workdir):
+    filename = os.path.join(workdir, 'standard_monitors.json')
+    return lambda: monitor_lists.save_to_json(monitors, filename)
+
+
+# Hot paths timed for every fleet size
+micro_benchmarks = {
+    'update_csv_row': bench_update_csv_row,
+    'plan_reverts': bench_plan_reverts,
+    'parse_recipients': bench_parse_recipients,
+    'remove_unnecessary_fields': bench_remove_unnecessary_fields,
+    'save_to_json': bench_save_to_json,
+}
+
+
+def time_call(run, repeat):
+    """Return the fastest of repeat timed calls of run, with output silenced."""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_full_drill(size, workdir, transition_delay=0.2):
+    """Drill size standard monitors against a local fake Datadog; return (seconds, API requests)."""
+    fake = FakeDatadog(monitors=size, api_tests=0, browser_tests=0,
+                       alert_delay=transition_delay, ok_delay=transition_delay)
+    url = fake.start()
+    journal = ResultJournal(os.path.join(workdir, 'drill.csv.journal'), strategies['Standard'].csv_fieldnames)
+    journal.open()
+
+    async def drill_monitor(engine, monitor):
+        await drill(engine, strategies['Standard'], monitor)
+
+    async def drill_everything():
+        client = AsyncDatadogClient(url, 'benchmark', 'benchmark')
+        engine = DrillEngine(client, max_concurrent_drills=drill_all.max_concurrent_drills,
+                             state_batch_size=drill_all.state_batch_size, polling_interval=transition_delay,
+                             min_polling_interval=transition_delay, max_polling_interval=transition_delay * 5,
+                             results=journal)
+        async with engine:
+            engine.limit_alerting(drill_all.max_alerting_monitors)
+            await engine.run(aiter_monitors(client), drill_monitor)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            asyncio.run(drill_everything())
+            elapsed = time.perf_counter() - started
+    finally:
+        journal.close()
+        fake.stop()
+    return elapsed, sum(fake.stats()['calls'].values())
+
+
+def run_benchmarks(sizes, drill_sizes, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            monitors, tests = build_fleet(size)
+            for name, setup in micro_benchmarks.items():
+                seconds = time_call(setup(monitors, tests, workdir), repeat)
+                results.append({'benchmark': name, 'size': size, 'seconds': round(seconds, 6),
+                                'per_item_us': round(seconds / size * 1e6, 3)})
+                print(f"{name:<28}{size:>8} monitors  {seconds:10.4f}s  {seconds / size * 1e6:10.2f} us/monitor")
+
+        for size in drill_sizes:
+            seconds, requests = run_full_drill(size, workdir)
+            results.append({'benchmark': 'full_drill', 'size': size, 'seconds': round(seconds, 6),
+                            'per_item_us': round(seconds / size * 1e6, 3), 'requests': requests,
+                            'requests_per_monitor': round(requests / size, 3)})
+            print(f"{'full_drill':<28}{size:>8} monitors  {seconds:10.4f}s  {requests / size:10.2f} requests/monitor")
+    return results
+
+
+def scaling_exponents(results):
+    """Return, per benchmark, how time grows with fleet size between the smallest and largest fleet (1.0 = linear)."""
+    exponents = {}
+    for name in sorted({result['benchmark'] for result in results}):
+        runs = sorted((result['size'], result['seconds']) for result in results if result['benchmark'] == name)
+        (small_size, small_seconds), (large_size, large_seconds) = runs[0], runs[-1]
+        if large_size > small_size and small_seconds > 0 and large_seconds >= min_comparable_seconds:
+            exponents[name] = round(math.log(large_seconds / small_seconds) / math.log(large_size / small_size), 3)
+    return exponents
+
+
+def find_regressions(report, baseline, tolerance):
+    """Return messages for results slower than the baseline, or growing superlinearly with fleet size."""
+    regressions = []
+    for name, exponent in report['scaling'].items():
+        if name in micro_benchmarks and exponent > max_scaling_exponent:
+            regressions.append(f"{name} grows as n^{exponent} with fleet size (limit n^{max_scaling_exponent})")
+
+    if baseline:
+        previous = {(result['benchmark'], result['size']): result for result in baseline.get('results', [])}
+        for result in report['results']:
+            before = previous.get((result['benchmark'], result['size']))
+            if before is None or before['seconds'] < min_comparable_seconds:
+                continue
+            ratio = result['seconds'] / before['seconds']
+            if ratio > 1 + tolerance:
+                regressions.append(f"{result['benchmark']} at {result['size']} monitors took {result['seconds']:.4f}s, "
+                                   f"{ratio:.2f}x the baseline {before['seconds']:.4f}s")
+            if result.get('requests') and before.get('requests') and result['requests'] > before['requests']:
+                regressions.append(f"{result['benchmark']} at {result['size']} monitors sent {result['requests']} "
+                                   f"API requests, baseline {before['requests']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drill and revert hot paths on synthetic fleets.")
+    parser.add_argument("--sizes", default=','.join(str(size) for size in default_sizes),
+                        help="Comma-separated fleet sizes for the hot-path benchmarks")
+    parser.add_argument("--drill-sizes", default="100,1000",
+                        help="Comma-separated fleet sizes for full drills against the fake API ('' to skip)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per hot-path benchmark; the fastest is kept")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=default_baseline, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="Only check how each hot path scales, without comparing against a baseline")
+    parser.add_argument("--tolerance", type=float, default=default_tolerance,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.save_baseline and not args.no_baseline:
+        if not os.path.exists(args.baseline):
+            # Timings depend on the machine, so every machine records its own baseline first
+            parser.error(f"no baseline at {args.baseline}: run once with --save-baseline on this machine, "
+                         f"or pass --no-baseline to only check how each hot path scales")
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    drill_sizes = [int(size) for size in args.drill_sizes.split(',') if size]
+    results = run_benchmarks(sizes, drill_sizes, args.repeat)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+        'scaling': scaling_exponents(results),
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f"Saved benchmark results to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=4)
+        print(f"Saved benchmark baseline to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if not regressions:
+        print("No regressions found.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
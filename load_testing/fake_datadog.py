@@ -0,0 +1,434 @@
+import argparse
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Seconds between a breaking or reverting change and the monitor changing state
+default_alert_delay = 5
+default_ok_delay = 5
+
+# Seconds between a synthetic test being triggered and its result flipping the monitor
+default_trigger_delay = 2
+
+# Endpoint groups sharing one rate limit, keyed by the X-RateLimit-Name they report
+rate_limit_groups = [
+    ('PUT', re.compile(r'^/api/v1/monitor/\d+$'), 'monitor_update'),
+    ('GET', re.compile(r'^/api/v1/monitor/search$'), 'monitor_search'),
+    ('GET', re.compile(r'^/api/v1/monitor(/\d+)?$'), 'monitor_read'),
+    ('POST', re.compile(r'^/api/v1/synthetics/tests/trigger$'), 'synthetics_trigger'),
+    (None, re.compile(r'^/api/v1/synthetics/'), 'synthetics'),
+]
+
+_id_pattern = re.compile(r'/(\d+|[a-z0-9]{3}-[a-z0-9]{3}-[a-z0-9]{3})(?=/|$)')
+
+
+def endpoint_name(method, path):
+    """Return the method and path of a request with IDs replaced by {id}."""
+    return f"{method} {_id_pattern.sub('/{id}', path)}"
+
+
+def rate_limit_name(method, path):
+    for group_method, pattern, name in rate_limit_groups:
+        if (group_method is None or group_method == method) and pattern.match(path):
+            return name
+    return 'default'
+
+
+def _public_id(number):
+    digits = f"{number:09d}"
+    return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+
+
+class FakeDatadog:
+    """In-memory stand-in for the Datadog monitor and synthetics API.
+
+    It serves the endpoints the drill, snapshot and revert scripts use. A
+    monitor whose configuration differs from the one it was seeded with goes
+    to Alert alert_delay seconds after the change, and back to OK ok_delay
+    seconds after it is restored. Synthetic tests behave the same, except
+    that a trigger brings the change forward to trigger_delay seconds.
+    Responses can be slowed down with latency and jitter, failed at
+    error_rate with a 500, and rate limited per endpoint group with real
+    X-RateLimit-* headers and 429s. Reads carry an ETag and are answered
+    with a 304 when it matches the request's If-None-Match.
+    """
+
+    def __init__(self, monitors=1000, api_tests=50, browser_tests=20, teams=20,
+                 alert_delay=default_alert_delay, ok_delay=default_ok_delay, trigger_delay=default_trigger_delay,
+                 latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, rate_limit_period=10,
+                 not_ok_fraction=0.0, seed=0):
+        self.alert_delay = alert_delay
+        self.ok_delay = ok_delay
+        self.trigger_delay = trigger_delay
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_period = rate_limit_period
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.rate_limited = 0
+        self.monitors = {}
+        self.tests = {}
+        self.baselines = {}
+        self.states = {}
+        self.transitions = {}
+        self._windows = {}
+        self._server = None
+        self.seed(monitors, api_tests, browser_tests, teams, not_ok_fraction)
+
+    def seed(self, monitors, api_tests, browser_tests, teams, not_ok_fraction=0.0):
+        """Create a fleet of standard monitors and API and browser tests with their synthetic monitors."""
+        now = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+        for monitor_id in range(1, monitors + 1):
+            team = f"team-{monitor_id % teams}"
+            self.monitors[monitor_id] = {
+                'id': monitor_id,
+                'name': f"CPU high on {team} host {monitor_id}",
+                'type': 'metric alert',
+                'query': f"avg(last_5m):avg:system.cpu.user{{team:{team},host:host-{monitor_id}}} > 90",
+                'message': f"CPU is high on {{{{host.name}}}}\n@slack-{team}\n@pagerduty-{team}",
+                'tags': [f"team:{team}", "env:prod", "service:compute"],
+                'options': {'thresholds': {'critical': 90}, 'notify_no_data': False, 'evaluation_delay': 0},
+                'multi': False,
+                'priority': None,
+                'restricted_roles': None,
+                'created': now,
+                'modified': now,
+            }
+            self.baselines[monitor_id] = self._config(self.monitors[monitor_id])
+            self.states[monitor_id] = 'Alert' if self.random.random() < not_ok_fraction else 'OK'
+
+        monitor_id = monitors
+        for index in range(1, api_tests + browser_tests + 1):
+            monitor_id += 1
+            test_type = 'api' if index <= api_tests else 'browser'
+            team = f"team-{index % teams}"
+            public_id = _public_id(index)
+            test = {
+                'public_id': public_id,
+                'name': f"{test_type} check {index} for {team}",
+                'type': test_type,
+                'status': 'live',
+                'monitor_id': monitor_id,
+                'message': f"Synthetic check failed\n@slack-{team}",
+                'tags': [f"team:{team}", "env:prod"],
+                'locations': ['aws:us-east-1'],
+                'options': {'tick_every': 300, 'min_failure_duration': 0,
+                            'retry': {'count': 0, 'interval': 300}},
+                'created_at': now,
+                'modified_at': now,
+            }
+            if test_type == 'api':
+                test['subtype'] = 'http'
+                test['config'] = {'request': {'method': 'GET', 'url': f"https://{team}.example.com/health"},
+                                  'assertions': [{'type': 'statusCode', 'operator': 'is', 'target': 200}]}
+            else:
+                test['config'] = {'request': {'method': 'GET', 'url': f"https://{team}.example.com/"},
+                                  'assertions': []}
+                test['options']['device_ids'] = ['laptop_large']
+            self.tests[public_id] = test
+            self.baselines[monitor_id] = self._config(test)
+            self.states[monitor_id] = 'OK'
+            self.monitors[monitor_id] = {
+                'id': monitor_id,
+                'name': f"[Synthetics] {test['name']}",
+                'type': 'synthetics alert',
+                'query': f"synthetics.test_run.failed{{public_id:{public_id}}}",
+                'message': test['message'],
+                'tags': test['tags'],
+                'options': {},
+                'created': now,
+                'modified': now,
+            }
+
+    @staticmethod
+    def _config(item):
+        return json.dumps({key: value for key, value in item.items()
+                           if key not in ('overall_state', 'created', 'modified', 'created_at', 'modified_at')},
+                          sort_keys=True)
+
+    def state(self, monitor_id):
+        """Return the current state of a monitor, applying a due transition."""
+        transition = self.transitions.get(monitor_id)
+        if transition is not None and time.monotonic() >= transition[1]:
+            self.states[monitor_id] = transition[0]
+            del self.transitions[monitor_id]
+        return self.states.get(monitor_id, 'OK')
+
+    def _schedule(self, monitor_id, item):
+        """Schedule the state change an update of item implies (Alert if it differs from its baseline)."""
+        target = 'OK' if self._config(item) == self.baselines.get(monitor_id) else 'Alert'
+        if self.state(monitor_id) == target:
+            self.transitions.pop(monitor_id, None)
+            return
+        delay = self.alert_delay if target == 'Alert' else self.ok_delay
+        self.transitions[monitor_id] = (target, time.monotonic() + delay)
+
+    def _check_rate_limit(self, method, path):
+        """Return (allowed, headers) for one request under the fixed-window rate limit of its group."""
+        if not self.rate_limit:
+            return True, {}
+        name = rate_limit_name(method, path)
+        now = time.monotonic()
+        window = self._windows.get(name)
+        if window is None or now >= window['reset_at']:
+            window = self._windows[name] = {'used': 0, 'reset_at': now + self.rate_limit_period}
+        window['used'] += 1
+        allowed = window['used'] <= self.rate_limit
+        headers = {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Period': str(self.rate_limit_period),
+            'X-RateLimit-Remaining': str(max(0, self.rate_limit - window['used'])),
+            'X-RateLimit-Reset': str(max(1, int(window['reset_at'] - now + 0.999))),
+            'X-RateLimit-Name': name,
+        }
+        return allowed, headers
+
+    def handle(self, method, path, query, body):
+        """Serve one API request and return (status_code, response_body, extra_headers)."""
+        with self.lock:
+            endpoint = endpoint_name(method, path)
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            allowed, headers = self._check_rate_limit(method, path)
+            if not allowed:
+                self.rate_limited += 1
+                return 429, {'errors': ['Too many requests']}, headers
+            if self.error_rate and self.random.random() < self.error_rate:
+                return 500, {'errors': ['Internal Server Error']}, headers
+            status, response = self._route(method, path, query, body)
+            return status, response, headers
+
+    def _route(self, method, path, query, body):
+        if method == 'GET' and path == '/api/v1/monitor':
+            return 200, self._list_monitors(query)
+        if method == 'GET' and path == '/api/v1/monitor/search':
+            return 200, self._search_monitors(query)
+        match = re.match(r'^/api/v1/monitor/(\d+)$', path)
+        if match:
+            monitor_id = int(match.group(1))
+            if monitor_id not in self.monitors:
+                return 404, {'errors': ['Monitor not found']}
+            if method == 'GET':
+                return 200, self._monitor(monitor_id)
+            if method == 'PUT':
+                return self._update_monitor(monitor_id, body)
+
+        if method == 'GET' and path == '/api/v1/synthetics/tests':
+            return 200, self._list_tests(query)
+        if method == 'POST' and path == '/api/v1/synthetics/tests/trigger':
+            return self._trigger(body)
+        match = re.match(r'^/api/v1/synthetics/tests/([a-z0-9-]+)$', path)
+        if match:
+            test = self.tests.get(match.group(1))
+            if test is None:
+                return 404, {'errors': ['Synthetic test not found']}
+            if method == 'GET':
+                return 200, test
+            if method == 'PUT':
+                return self._update_test(test, body)
+        return 404, {'errors': [f"No fake endpoint for {method} {path}"]}
+
+    def _monitor(self, monitor_id):
+        return dict(self.monitors[monitor_id], overall_state=self.state(monitor_id))
+
+    def _list_monitors(self, query):
+        monitor_ids = list(self.monitors)
+        if 'page' in query:
+            page_size = int(query.get('page_size', ['100'])[0])
+            page = int(query['page'][0])
+            monitor_ids = monitor_ids[page * page_size:(page + 1) * page_size]
+        return [self._monitor(monitor_id) for monitor_id in monitor_ids]
+
+    def _search_monitors(self, query):
+        text = query.get('query', [''])[0]
+        per_page = int(query.get('per_page', ['30'])[0])
+        page = int(query.get('page', ['0'])[0])
+        match = re.search(r'id:\(([^)]*)\)', text) or re.search(r'id:(\d+)', text)
+        if match:
+            monitor_ids = [int(value) for value in re.findall(r'\d+', match.group(1)) if int(value) in self.monitors]
+        else:
+            monitor_ids = list(self.monitors)
+        selected = monitor_ids[page * per_page:(page + 1) * per_page]
+        return {
+            'monitors': [{'id': monitor_id, 'name': self.monitors[monitor_id]['name'],
+                          'type': self.monitors[monitor_id]['type'], 'status': self.state(monitor_id),
+                          'tags': self.monitors[monitor_id].get('tags', [])} for monitor_id in selected],
+            'metadata': {'page': page, 'per_page': per_page, 'total_count': len(monitor_ids),
+                         'page_count': (len(monitor_ids) + per_page - 1) // per_page if per_page else 0},
+        }
+
+    def _update_monitor(self, monitor_id, body):
+        if not isinstance(body, dict) or not body.get('query'):
+            return 400, {'errors': ['The query is required']}
+        monitor = self.monitors[monitor_id]
+        for key, value in body.items():
+            if key not in ('id', 'overall_state', 'created', 'modified'):
+                monitor[key] = copy.deepcopy(value)
+        monitor['modified'] = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+        self._schedule(monitor_id, monitor)
+        return 200, self._monitor(monitor_id)
+
+    def _list_tests(self, query):
+        tests = list(self.tests.values())
+        if 'page_number' in query:
+            page_size = int(query.get('page_size', ['100'])[0])
+            page = int(query['page_number'][0])
+            tests = tests[page * page_size:(page + 1) * page_size]
+        return {'tests': tests}
+
+    def _update_test(self, test, body):
+        if not isinstance(body, dict) or 'config' not in body:
+            return 400, {'errors': ['The config is required']}
+        for key, value in body.items():
+            if key not in ('public_id', 'monitor_id', 'created_at', 'modified_at', 'creator'):
+                test[key] = copy.deepcopy(value)
+        test['modified_at'] = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+        self._schedule(test['monitor_id'], test)
+        return 200, test
+
+    def _trigger(self, body):
+        results = []
+        for entry in (body or {}).get('tests', []):
+            test = self.tests.get(entry.get('public_id'))
+            if test is None:
+                continue
+            monitor_id = test['monitor_id']
+            transition = self.transitions.get(monitor_id)
+            if transition is not None:
+                due = time.monotonic() + self.trigger_delay
+                self.transitions[monitor_id] = (transition[0], min(transition[1], due))
+            results.append({'public_id': test['public_id'], 'location': 1,
+                            'result_id': str(self.random.getrandbits(63))})
+        return 200, {'results': results, 'triggered_check_ids': [result['public_id'] for result in results],
+                     'locations': [{'id': 1, 'name': 'aws:us-east-1'}]}
+
+    def stats(self):
+        """Return request counts per endpoint and the number of 429s served."""
+        with self.lock:
+            return {'calls': dict(self.calls), 'rate_limited': self.rate_limited}
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve the fake API on a background thread and return its base URL."""
+        self._server = _Server((host, port), _handler_for(self))
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 makes bursts of concurrent connections stall on SYN retransmits
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def _handler_for(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self, method):
+            url = urlparse(self.path)
+            path = re.sub(r'/+', '/', url.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            raw_body = self.rfile.read(length) if length else b''
+
+            if fake.latency or fake.jitter:
+                time.sleep(max(0.0, fake.latency + random.uniform(-fake.jitter, fake.jitter)))
+
+            if path == '/fake/stats':
+                status, body, headers = 200, fake.stats(), {}
+            elif not self.headers.get('DD-API-KEY'):
+                status, body, headers = 403, {'errors': ['Forbidden']}, {}
+            else:
+                try:
+                    body = json.loads(raw_body) if raw_body else None
+                except ValueError:
+                    body = None
+                status, body, headers = fake.handle(method, path, parse_qs(url.query), body)
+
+            payload = json.dumps(body).encode('utf-8')
+            if method == 'GET' and status == 200:
+                # Tag every read with an ETag of its body, and answer a matching If-None-Match with a bare 304
+                etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+                headers = dict(headers, ETag=etag)
+                if self.headers.get('If-None-Match') == etag:
+                    status, payload = 304, b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._serve('GET')
+
+        def do_PUT(self):
+            self._serve('PUT')
+
+        def do_POST(self):
+            self._serve('POST')
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Datadog monitor and synthetics API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8126)
+    parser.add_argument("--monitors", type=int, default=1000, help="Standard monitors to create")
+    parser.add_argument("--api-tests", type=int, default=50, help="Synthetic API tests to create")
+    parser.add_argument("--browser-tests", type=int, default=20, help="Synthetic browser tests to create")
+    parser.add_argument("--teams", type=int, default=20, help="Distinct team tags and recipients")
+    parser.add_argument("--alert-delay", type=float, default=default_alert_delay,
+                        help="Seconds from a breaking change to Alert")
+    parser.add_argument("--ok-delay", type=float, default=default_ok_delay,
+                        help="Seconds from a revert to OK")
+    parser.add_argument("--trigger-delay", type=float, default=default_trigger_delay,
+                        help="Seconds from a synthetic trigger to its result")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failed with a 500")
+    parser.add_argument("--rate-limit", type=int, default=None,
+                        help="Requests allowed per endpoint group and period before 429s")
+    parser.add_argument("--rate-limit-period", type=int, default=10, help="Seconds per rate-limit window")
+    parser.add_argument("--not-ok-fraction", type=float, default=0.0,
+                        help="Fraction of standard monitors already alerting at start")
+    args = parser.parse_args()
+
+    fake = FakeDatadog(args.monitors, args.api_tests, args.browser_tests, args.teams,
+                       alert_delay=args.alert_delay, ok_delay=args.ok_delay, trigger_delay=args.trigger_delay,
+                       latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                       rate_limit=args.rate_limit, rate_limit_period=args.rate_limit_period,
+                       not_ok_fraction=args.not_ok_fraction)
+    url = fake.start(args.host, args.port)
+    print(f"Fake Datadog API serving {args.monitors} monitors, {args.api_tests} API tests and "
+          f"{args.browser_tests} browser tests at {url}")
+    print(f"Point the scripts at it with: export DATADOG_URL={url}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+        print(json.dumps(fake.stats(), indent=4))
+
+
+if __name__ == "__main__":
+    main()
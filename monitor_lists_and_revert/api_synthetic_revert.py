@@ -1,30 +1,30 @@
-import requests
-import json
+import os
+import sys
 
-# Datadog API details
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from datadog_common.client import DatadogClient
+from datadog_common.discovery import iter_synthetic_tests
+from datadog_common.response_cache import ResponseCache, cache_filename
+from backups import load_backup
+from revert_plan import BackupDiff
+
+# Datadog API details; DATADOG_URL points the script at another site or at load_testing/fake_datadog.py
 api_key = "xxxxx"
 app_key = "xxxx"
-datadog_url = "https://us5.datadoghq.com/"
+datadog_url = os.environ.get("DATADOG_URL", "https://us5.datadoghq.com/")
 
 
-# Headers for authentication
-headers = {
-    "DD-API-KEY": api_key,
-    "DD-APPLICATION-KEY": app_key,
-    "Content-Type": "application/json"
-}
+# GET responses reused within the run and kept in a per-site, per-organization file for the next one;
+# lists and monitor states are revalidated with If-None-Match, so an unchanged result costs a 304
+response_cache = ResponseCache(cache_filename(datadog_url, api_key))
+
+# Pooled API client shared by every request in this script
+client = DatadogClient(datadog_url, api_key, app_key, cache=response_cache)
 
 def fetch_all_synthetic_api_tests():
-    """Fetch all synthetic API tests from Datadog."""
-    url = f"{datadog_url}/api/v1/synthetics/tests"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        all_tests = response.json().get('tests', [])
-        return [test for test in all_tests if test['type'] == 'api']
-    else:
-        print(f"Failed to fetch synthetic API tests, Status code: {response.status_code}")
-        return []
+    """Stream all synthetic API tests from Datadog page by page."""
+    return iter_synthetic_tests(client, test_type='api')
 
 def remove_unnecessary_fields(data):
     """Remove fields that should not be included in the update request for synthetic tests."""
@@ -36,9 +36,8 @@ def remove_unnecessary_fields(data):
 
 def revert_synthetic_test(test_id, backup_data):
     """Revert a synthetic API test to its previous state."""
-    url = f"{datadog_url}/api/v1/synthetics/tests/{test_id}"
     backup_data = remove_unnecessary_fields(backup_data)
-    response = requests.put(url, headers=headers, json=backup_data)
+    response = client.put(f"/api/v1/synthetics/tests/{test_id}", json=backup_data)
     
     if response.status_code == 200:
         print(f"Reverted synthetic API test ID: {test_id} to previous state.")
@@ -47,25 +46,23 @@ def revert_synthetic_test(test_id, backup_data):
         print(f"Response: {response.text}")
 
 def main():
-    # Load the backup JSON file
-    backup_filename = input("Enter the filename of the JSON backup to revert from (e.g., previous_backup.json): ")
-    with open(backup_filename, 'r') as file:
-        backup_data = json.load(file)
-
-    synthetic_api_tests_backup = backup_data if isinstance(backup_data, list) else backup_data.get('synthetic_api_tests', [])
+    # Load the backup JSON file or snapshot manifest
+    backup_filename = input("Enter the filename of the JSON backup or snapshot manifest to revert from (e.g., previous_backup.json): ")
+    synthetic_api_tests_backup = load_backup(backup_filename, 'synthetic_api_tests')
 
     # Fetch the current state of all synthetic API tests
     current_synthetic_api_tests = fetch_all_synthetic_api_tests()
 
-    # Revert changes if detected
-    for current_test in current_synthetic_api_tests:
-        current_id = current_test.get('public_id')
-        for backup_test in synthetic_api_tests_backup:
-            if current_id == backup_test.get('public_id'):
-                if current_test != backup_test:
-                    print(f"Detected changes in synthetic API test ID: {current_id}. Reverting...")
-                    revert_synthetic_test(current_id, backup_test)
-                    break
+    # Revert changes if detected, joining against an ID index of the backup in one pass
+    diff = BackupDiff(synthetic_api_tests_backup, 'public_id')
+    for current_id, current_item, backup_item in diff.changed(current_synthetic_api_tests):
+        print(f"Detected changes in synthetic API test ID: {current_id}. Reverting...")
+        revert_synthetic_test(current_id, backup_item)
+    diff.print_summary("synthetic API test")
+
+    client.stats.print_summary()
+    response_cache.print_summary()
+    response_cache.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import json
+
+from ndjson_snapshot import is_ndjson_snapshot, iter_snapshot
+from snapshot_store import SnapshotStore, is_manifest
+
+
+def load_backups(filename, categories):
+    """Return {category: items} for the given categories of a backup.
+
+    filename may be a legacy JSON backup (a category file or a master file),
+    a snapshot manifest or an NDJSON snapshot written by monitor_lists.py.
+    A category file holds a plain list, which is returned for every
+    requested category.
+    """
+    if is_ndjson_snapshot(filename):
+        backups = {category: [] for category in categories}
+        for category, item in iter_snapshot(filename, categories):
+            backups[category].append(item)
+        return backups
+
+    with open(filename, 'r') as file:
+        backup_data = json.load(file)
+
+    if is_manifest(backup_data):
+        store = SnapshotStore.for_manifest(filename)
+        return {category: list(store.iter_items(backup_data, category)) for category in categories}
+    if isinstance(backup_data, list):
+        return {category: backup_data for category in categories}
+    return {category: backup_data.get(category, []) for category in categories}
+
+
+def load_backup(filename, category):
+    """Return the backed-up items of one category; NDJSON snapshots are read lazily."""
+    if is_ndjson_snapshot(filename):
+        return (item for _, item in iter_snapshot(filename, [category]))
+    return load_backups(filename, [category])[category]
@@ -0,0 +1,34 @@
+import hashlib
+import json
+
+# Fields Datadog updates on its own; they differ between snapshots even when nobody edited anything
+volatile_fields = {
+    'overall_state', 'overall_state_modified', 'state', 'matching_downtimes',
+    'created', 'created_at', 'creator', 'modified', 'modified_at', 'modified_by', 'deleted',
+}
+
+# List fields whose order carries no meaning
+unordered_list_fields = {'tags', 'locations', 'restricted_roles'}
+
+
+def _sort_key(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def canonicalize(item):
+    """Return the configuration of a monitor or synthetic test without volatile fields and with unordered lists sorted."""
+    config = {field: value for field, value in item.items() if field not in volatile_fields}
+    for field in unordered_list_fields:
+        if isinstance(config.get(field), list):
+            config[field] = sorted(config[field], key=_sort_key)
+    return config
+
+
+def canonical_json(item):
+    """Serialize the canonical configuration of an item with a stable key order and spacing."""
+    return json.dumps(canonicalize(item), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def fingerprint(item):
+    """Return a stable SHA-256 fingerprint of an item's configuration."""
+    return hashlib.sha256(canonical_json(item).encode('utf-8')).hexdigest()
@@ -1,54 +1,57 @@
-import requests
-import json
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Datadog API details
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from datadog_common.client import DatadogClient
+from datadog_common.discovery import iter_monitors, iter_synthetic_tests
+from datadog_common.response_cache import ResponseCache, cache_filename
+from backups import load_backups
+from revert_plan import BackupDiff
+
+# Datadog API details; DATADOG_URL points the script at another site or at load_testing/fake_datadog.py
 api_key = "xxxx"
 app_key = "xxxx"
-datadog_url = "https://us5.datadoghq.com/"
+datadog_url = os.environ.get("DATADOG_URL", "https://us5.datadoghq.com/")
+
+# Concurrent reverts in bulk mode; kept below the client's connection pool size
+max_revert_workers = 16
+
+# Seconds between progress lines while the revert plan is executed
+progress_interval = 5
+
+# GET responses reused within the run and kept in a per-site, per-organization file for the next one;
+# lists and monitor states are revalidated with If-None-Match, so an unchanged result costs a 304
+response_cache = ResponseCache(cache_filename(datadog_url, api_key))
+
+# Pooled API client shared by every request in this script
+client = DatadogClient(datadog_url, api_key, app_key, cache=response_cache)
 
-# Headers for authentication
-headers = {
-    "DD-API-KEY": api_key,
-    "DD-APPLICATION-KEY": app_key,
-    "Content-Type": "application/json"
-}
+# Keeps lines printed by concurrent reverts from interleaving
+output_lock = threading.Lock()
+
+def report(*lines):
+    """Print lines as one block, safe to call from revert worker threads."""
+    with output_lock:
+        print("\n".join(lines), flush=True)
 
 def fetch_all_standard_monitors():
-    """Fetch all standard monitors from Datadog, excluding synthetic monitors."""
-    url = f"{datadog_url}/api/v1/monitor"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        all_monitors = response.json()
-        standard_monitors = [monitor for monitor in all_monitors if 'synthetics alert' not in monitor.get('type', '').lower()]
-        return standard_monitors
-    else:
-        print(f"Failed to fetch monitors, Status code: {response.status_code}")
-        return []
-
-def fetch_all_synthetic_api_tests():
-    """Fetch all synthetic API tests from Datadog."""
-    url = f"{datadog_url}/api/v1/synthetics/tests"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        all_tests = response.json().get('tests', [])
-        return [test for test in all_tests if test['type'] == 'api']
-    else:
-        print(f"Failed to fetch synthetic API tests, Status code: {response.status_code}")
-        return []
-
-def fetch_all_synthetic_browser_tests():
-    """Fetch all synthetic browser tests from Datadog."""
-    url = f"{datadog_url}/api/v1/synthetics/tests"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        all_tests = response.json().get('tests', [])
-        return [test for test in all_tests if test['type'] == 'browser']
-    else:
-        print(f"Failed to fetch synthetic browser tests, Status code: {response.status_code}")
-        return []
+    """Stream all standard monitors from Datadog page by page, excluding synthetic monitors."""
+    return iter_monitors(client)
+
+def fetch_all_synthetic_tests_by_type():
+    """Fetch all synthetic tests in one paginated pass and split them into (api_tests, browser_tests)."""
+    api_tests, browser_tests = [], []
+    for test in iter_synthetic_tests(client):
+        if test.get('type') == 'api':
+            api_tests.append(test)
+        elif test.get('type') == 'browser':
+            browser_tests.append(test)
+    return api_tests, browser_tests
 
 def remove_unnecessary_fields(data):
     """Remove fields that should not be included in the update request for synthetic tests."""
@@ -60,64 +63,95 @@ def remove_unnecessary_fields(data):
 
 def revert_monitor(monitor_id, backup_data):
     """Revert a standard monitor to its previous state."""
-    url = f"{datadog_url}/api/v1/monitor/{monitor_id}"
-    response = requests.put(url, headers=headers, json=backup_data)
+    response = client.put(f"/api/v1/monitor/{monitor_id}", json=backup_data)
     
     if response.status_code == 200:
-        print(f"Reverted standard monitor ID: {monitor_id} to previous state.")
-    else:
-        print(f"Failed to revert standard monitor ID: {monitor_id}, Status code: {response.status_code}")
-        print(f"Response: {response.text}")
+        report(f"Reverted standard monitor ID: {monitor_id} to previous state.")
+        return True
+    report(f"Failed to revert standard monitor ID: {monitor_id}, Status code: {response.status_code}",
+           f"Response: {response.text}")
+    return False
 
 def revert_synthetic_test(test_id, backup_data):
     """Revert a synthetic test (API or browser) to its previous state."""
-    url = f"{datadog_url}/api/v1/synthetics/tests/{test_id}"
     backup_data = remove_unnecessary_fields(backup_data)
-    response = requests.put(url, headers=headers, json=backup_data)
+    response = client.put(f"/api/v1/synthetics/tests/{test_id}", json=backup_data)
     
     if response.status_code == 200:
-        print(f"Reverted synthetic test ID: {test_id} to previous state.")
-    else:
-        print(f"Failed to revert synthetic test ID: {test_id}, Status code: {response.status_code}")
-        print(f"Response: {response.text}")
-
-def compare_and_revert(current_items, backup_items, item_type):
-    """Compare current items with backup items and revert if changes are detected."""
-    for current_item in current_items:
-        current_id = current_item.get('id') if item_type == "standard monitor" else current_item.get('public_id')
-        for backup_item in backup_items:
-            backup_id = backup_item.get('id') if item_type == "standard monitor" else backup_item.get('public_id')
-            if current_id == backup_id:
-                if current_item != backup_item:
-                    print(f"Detected changes in {item_type} ID: {current_id}. Reverting...")
-                    if item_type == "standard monitor":
-                        revert_monitor(current_id, backup_item)
-                    else:
-                        revert_synthetic_test(current_id, backup_item)
-                    break
+        report(f"Reverted synthetic test ID: {test_id} to previous state.")
+        return True
+    report(f"Failed to revert synthetic test ID: {test_id}, Status code: {response.status_code}",
+           f"Response: {response.text}")
+    return False
+
+def plan_reverts(current_items, backup_items, item_type):
+    """Diff current items against the backup and return the [(item_type, item_id, backup_item)] to revert."""
+    id_field = 'id' if item_type == "standard monitor" else 'public_id'
+    diff = BackupDiff(backup_items, id_field)
+    plan = [(item_type, item_id, backup_item) for item_id, _, backup_item in diff.changed(current_items)]
+    diff.print_summary(item_type)
+    return plan
+
+def revert_item(item_type, item_id, backup_item):
+    """Revert one planned item, reporting connection failures instead of raising."""
+    try:
+        if item_type == "standard monitor":
+            return revert_monitor(item_id, backup_item)
+        return revert_synthetic_test(item_id, backup_item)
+    except Exception as e:
+        report(f"Failed to revert {item_type} ID: {item_id}, Error: {e}")
+        return False
+
+def execute_plan(plan, max_workers=max_revert_workers):
+    """Run the planned reverts through a bounded thread pool and return (reverted, failed)."""
+    total = len(plan)
+    reverted = failed = 0
+    started = last_report = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(revert_item, *planned) for planned in plan]
+        for future in as_completed(futures):
+            if future.result():
+                reverted += 1
+            else:
+                failed += 1
+            now = time.monotonic()
+            if now - last_report >= progress_interval:
+                last_report = now
+                report(f"Revert progress: {reverted + failed}/{total} done, {failed} failed, {now - started:.0f}s elapsed")
+
+    print(f"Revert finished: {reverted} reverted, {failed} failed out of {total} in {time.monotonic() - started:.1f}s")
+    return reverted, failed
 
 def main():
-    # Load the backup JSON file
-    backup_filename = input("Enter the filename of the JSON backup to revert from (e.g., previous_backup.json): ")
-    with open(backup_filename, 'r') as file:
-        backup_data = json.load(file)
-
-    # Separate the data from the backup
-    standard_monitors_backup = backup_data.get('standard_monitors', [])
-    synthetic_api_tests_backup = backup_data.get('synthetic_api_tests', [])
-    synthetic_browser_tests_backup = backup_data.get('synthetic_browser_tests', [])
-
-    # Fetch the current state of all monitors and tests
-    current_standard_monitors = fetch_all_standard_monitors()
-    current_synthetic_api_tests = fetch_all_synthetic_api_tests()
-    current_synthetic_browser_tests = fetch_all_synthetic_browser_tests()
-
-    # Compare and revert for standard monitors
-    compare_and_revert(current_standard_monitors, standard_monitors_backup, "standard monitor")
-    # Compare and revert for synthetic API tests
-    compare_and_revert(current_synthetic_api_tests, synthetic_api_tests_backup, "synthetic API test")
-    # Compare and revert for synthetic browser tests
-    compare_and_revert(current_synthetic_browser_tests, synthetic_browser_tests_backup, "synthetic browser test")
+    parser = argparse.ArgumentParser(description="Revert monitors and synthetic tests to a backup.")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the revert plan")
+    parser.add_argument("--max-workers", type=int, default=max_revert_workers, help="Concurrent revert requests")
+    args = parser.parse_args()
+
+    # Load the backup JSON file or snapshot manifest
+    backup_filename = input("Enter the filename of the JSON backup or snapshot manifest to revert from (e.g., previous_backup.json): ")
+    backups = load_backups(backup_filename, ['standard_monitors', 'synthetic_api_tests', 'synthetic_browser_tests'])
+
+    # Fetch the current state of all monitors, and all synthetic tests in one shared pass
+    current_synthetic_api_tests, current_synthetic_browser_tests = fetch_all_synthetic_tests_by_type()
+
+    # Build the full revert plan before changing anything
+    plan = []
+    plan += plan_reverts(fetch_all_standard_monitors(), backups['standard_monitors'], "standard monitor")
+    plan += plan_reverts(current_synthetic_api_tests, backups['synthetic_api_tests'], "synthetic API test")
+    plan += plan_reverts(current_synthetic_browser_tests, backups['synthetic_browser_tests'], "synthetic browser test")
+    print(f"Revert plan: {len(plan)} item(s) to revert")
+
+    if args.dry_run:
+        for item_type, item_id, _ in plan:
+            print(f"Would revert {item_type} ID: {item_id}")
+    elif plan:
+        execute_plan(plan, args.max_workers)
+
+    client.stats.print_summary()
+    response_cache.print_summary()
+    response_cache.save()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
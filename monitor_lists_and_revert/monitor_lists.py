@@ -1,73 +1,80 @@
-import requests
+import argparse
 import json
 import os
+import sys
+import textwrap
 from datetime import datetime
 
-# Datadog API details
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from datadog_common.client import DatadogClient
+from datadog_common.discovery import iter_monitors, iter_synthetic_tests
+from datadog_common.response_cache import ResponseCache, cache_filename
+from ndjson_snapshot import SnapshotWriter, compression_extensions
+from snapshot_store import SnapshotStore
+
+# Datadog API details; DATADOG_URL points the script at another site or at load_testing/fake_datadog.py
 api_key = "xxxx"
 app_key = "xxxx"
-datadog_url = "https://us5.datadoghq.com/"
+datadog_url = os.environ.get("DATADOG_URL", "https://us5.datadoghq.com/")
 
 
-# Headers for authentication
-headers = {
-    "DD-API-KEY": api_key,
-    "DD-APPLICATION-KEY": app_key,
-    "Content-Type": "application/json"
-}
+# GET responses reused within the run and kept in a per-site, per-organization file for the next one;
+# lists and monitor states are revalidated with If-None-Match, so an unchanged result costs a 304
+response_cache = ResponseCache(cache_filename(datadog_url, api_key))
+
+# Pooled API client shared by every request in this script
+client = DatadogClient(datadog_url, api_key, app_key, cache=response_cache)
 
 def fetch_all_monitors():
-    """Fetch all standard monitors (excluding synthetic monitors) from Datadog."""
-    url = f"{datadog_url}/api/v1/monitor"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        all_monitors = response.json()
-        # Filter out synthetic monitors
-        standard_monitors = [
-            monitor for monitor in all_monitors 
-            if 'synthetics alert' not in monitor.get('type', '').lower()
-        ]
-        return standard_monitors
-    else:
-        print(f"Failed to fetch monitors, Status code: {response.status_code}")
-        print(f"Response: {response.text}")
-        return []
+    """Stream all standard monitors (excluding synthetic monitors) from Datadog, page by page."""
+    return iter_monitors(client)
 
 def fetch_all_synthetic_tests():
-    """Fetch all synthetic tests (both API and browser) from Datadog."""
-    url = f"{datadog_url}/api/v1/synthetics/tests"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        return response.json().get('tests', [])
-    else:
-        print(f"Failed to fetch synthetic tests, Status code: {response.status_code}")
-        print(f"Response: {response.text}")
-        return []
+    """Stream all synthetic tests (both API and browser) from Datadog, page by page."""
+    return iter_synthetic_tests(client)
 
-def save_to_json(data, filename):
-    """Save data to a JSON file."""
-    with open(filename, 'w') as file:
-        json.dump(data, file, indent=4)
-    print(f"Saved monitor details to {filename}")
+class JsonArrayWriter:
+    """Write a pretty-printed JSON array one item at a time."""
 
-def main():
-    # Fetch monitors and synthetics
-    standard_monitors = fetch_all_monitors()
-    all_synthetics = fetch_all_synthetic_tests()
+    def __init__(self, filename):
+        self.filename = filename
+        self.count = 0
+        self._file = open(filename, 'w')
+        self._file.write("[")
+
+    def write(self, item):
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(textwrap.indent(json.dumps(item, indent=4), "    "))
+        self.count += 1
 
-    # Separate synthetic API and browser tests
-    synthetic_api_tests = [test for test in all_synthetics if test['type'] == 'api']
-    synthetic_browser_tests = [test for test in all_synthetics if test['type'] == 'browser']
+    def close(self):
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
 
-    # Combine all monitors into one master JSON structure
-    master_monitors = {
-        "standard_monitors": standard_monitors,
-        "synthetic_api_tests": synthetic_api_tests,
-        "synthetic_browser_tests": synthetic_browser_tests
-    }
+def save_to_json(data, filename):
+    """Save data to a JSON file, streaming it item by item."""
+    writer = JsonArrayWriter(filename)
+    for item in data:
+        writer.write(item)
+    writer.close()
+    print(f"Saved monitor details to {filename}")
 
+def save_master_json(category_filenames, filename):
+    """Combine already-written category files into one master JSON file without loading them."""
+    with open(filename, 'w') as master:
+        master.write("{")
+        for index, (category, category_filename) in enumerate(category_filenames.items()):
+            master.write(",\n" if index else "\n")
+            master.write(f"    {json.dumps(category)}: ")
+            with open(category_filename) as file:
+                for line_number, line in enumerate(file):
+                    master.write(line if line_number == 0 else "    " + line)
+        master.write("\n}")
+    print(f"Saved monitor details to {filename}")
+
+def save_json_backup():
+    """Write the timestamped per-category JSON files and the master JSON file."""
     # Filenames for the JSON outputs
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     standard_monitors_filename = f"standard_monitors_{timestamp}.json"
@@ -75,13 +82,86 @@ def main():
     synthetic_browser_tests_filename = f"synthetic_browser_tests_{timestamp}.json"
     master_monitors_filename = f"master_monitors_{timestamp}.json"
 
-    # Save each category to its respective JSON file
-    save_to_json(standard_monitors, standard_monitors_filename)
-    save_to_json(synthetic_api_tests, synthetic_api_tests_filename)
-    save_to_json(synthetic_browser_tests, synthetic_browser_tests_filename)
-    
+    # Stream standard monitors to disk as each page arrives
+    save_to_json(fetch_all_monitors(), standard_monitors_filename)
+
+    # Split the synthetics stream into API and browser tests as it arrives
+    api_writer = JsonArrayWriter(synthetic_api_tests_filename)
+    browser_writer = JsonArrayWriter(synthetic_browser_tests_filename)
+    for test in fetch_all_synthetic_tests():
+        if test['type'] == 'api':
+            api_writer.write(test)
+        elif test['type'] == 'browser':
+            browser_writer.write(test)
+    api_writer.close()
+    browser_writer.close()
+    print(f"Saved monitor details to {synthetic_api_tests_filename}")
+    print(f"Saved monitor details to {synthetic_browser_tests_filename}")
+
     # Save the master JSON with all monitors combined
-    save_to_json(master_monitors, master_monitors_filename)
+    save_master_json({
+        "standard_monitors": standard_monitors_filename,
+        "synthetic_api_tests": synthetic_api_tests_filename,
+        "synthetic_browser_tests": synthetic_browser_tests_filename
+    }, master_monitors_filename)
+
+def save_snapshot(store_dir):
+    """Store every configuration in the content-addressed store and write a manifest of this snapshot."""
+    store = SnapshotStore(store_dir)
+    categories = {"standard_monitors": [], "synthetic_api_tests": [], "synthetic_browser_tests": []}
+
+    for monitor in fetch_all_monitors():
+        categories["standard_monitors"].append([monitor['id'], store.put(monitor)])
+
+    for test in fetch_all_synthetic_tests():
+        if test['type'] == 'api':
+            categories["synthetic_api_tests"].append([test['public_id'], store.put(test)])
+        elif test['type'] == 'browser':
+            categories["synthetic_browser_tests"].append([test['public_id'], store.put(test)])
+
+    manifest_path = store.write_manifest(categories)
+    total = sum(len(entries) for entries in categories.values())
+    print(f"Saved snapshot manifest to {manifest_path}")
+    print(f"{total} configurations in snapshot, {store.new_objects} new since earlier snapshots")
+
+def save_ndjson_snapshot(compression):
+    """Stream every configuration into one compressed NDJSON snapshot file."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    snapshot_filename = f"snapshot_{timestamp}{compression_extensions[compression]}"
+
+    writer = SnapshotWriter(snapshot_filename, compression)
+    for monitor in fetch_all_monitors():
+        writer.write("standard_monitors", monitor)
+    for test in fetch_all_synthetic_tests():
+        if test['type'] == 'api':
+            writer.write("synthetic_api_tests", test)
+        elif test['type'] == 'browser':
+            writer.write("synthetic_browser_tests", test)
+    writer.close()
+
+    counts = ', '.join(f"{count} {category}" for category, count in writer.counts.items())
+    print(f"Saved snapshot to {snapshot_filename} ({counts or 'empty'})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up Datadog monitors and synthetic tests.")
+    parser.add_argument("--format", choices=["store", "ndjson", "json"], default="store",
+                        help="store: content-addressed snapshot (default); ndjson: one compressed NDJSON file; "
+                             "json: full timestamped JSON files")
+    parser.add_argument("--store-dir", default="snapshots", help="Directory of the snapshot store")
+    parser.add_argument("--compression", choices=sorted(compression_extensions), default="gzip",
+                        help="Compression of --format ndjson snapshots (zstd needs the zstandard package)")
+    args = parser.parse_args()
+
+    if args.format == "store":
+        save_snapshot(args.store_dir)
+    elif args.format == "ndjson":
+        save_ndjson_snapshot(args.compression)
+    else:
+        save_json_backup()
+
+    client.stats.print_summary()
+    response_cache.print_summary()
+    response_cache.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
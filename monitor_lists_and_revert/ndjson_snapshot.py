@@ -0,0 +1,114 @@
+import gzip
+import io
+import json
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+snapshot_format = 'datadog-snapshot-ndjson'
+
+gzip_magic = b'\x1f\x8b'
+zstd_magic = b'\x28\xb5\x2f\xfd'
+
+# File extension used for each compression
+compression_extensions = {'gzip': '.ndjson.gz', 'zstd': '.ndjson.zst', 'none': '.ndjson'}
+
+
+def _open_binary(filename, mode, compression):
+    if compression == 'gzip':
+        return gzip.open(filename, mode + 'b')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd snapshots need the zstandard package (pip install zstandard)")
+        raw = open(filename, mode + 'b')
+        if mode == 'w':
+            return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(filename, mode + 'b')
+
+
+def detect_compression(filename):
+    """Return 'gzip', 'zstd' or 'none' from the magic bytes of a file."""
+    with open(filename, 'rb') as file:
+        head = file.read(4)
+    if head.startswith(gzip_magic):
+        return 'gzip'
+    if head.startswith(zstd_magic):
+        return 'zstd'
+    return 'none'
+
+
+class SnapshotWriter:
+    """Stream monitors and synthetic tests into a compressed NDJSON snapshot.
+
+    The first line is a header record, followed by one item record per
+    configuration as it is fetched and a footer with per-category counts, so
+    nothing but the current item is ever held in memory.
+    """
+
+    def __init__(self, filename, compression='gzip'):
+        self.filename = filename
+        self.compression = compression
+        self.counts = {}
+        self._file = io.TextIOWrapper(_open_binary(filename, 'w', compression), encoding='utf-8')
+        self._write_record({
+            'record': 'header',
+            'format': snapshot_format,
+            'version': 1,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'compression': compression,
+        })
+
+    def _write_record(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+        self._file.write('\n')
+
+    def write(self, category, item):
+        self._write_record({'record': 'item', 'category': category, 'item': item})
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+    def close(self):
+        self._write_record({'record': 'footer', 'counts': self.counts})
+        self._file.close()
+
+
+def _iter_records(filename):
+    compression = detect_compression(filename)
+    with io.TextIOWrapper(_open_binary(filename, 'r', compression), encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def is_ndjson_snapshot(filename):
+    """Return True if filename starts with an NDJSON snapshot header record."""
+    if detect_compression(filename) != 'none':
+        return True
+    with open(filename, 'r', encoding='utf-8') as file:
+        first_line = file.readline()
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        return False
+    return isinstance(header, dict) and header.get('record') == 'header' and header.get('format') == snapshot_format
+
+
+def iter_snapshot(filename, categories=None):
+    """Lazily yield (category, item) pairs from an NDJSON snapshot, optionally only those of some categories."""
+    records = _iter_records(filename)
+    header = next(records, None)
+    if header is None or header.get('record') != 'header' or header.get('format') != snapshot_format:
+        raise ValueError(f"{filename} is not a {snapshot_format} file")
+
+    complete = False
+    for record in records:
+        if record.get('record') == 'footer':
+            complete = True
+        elif record.get('record') == 'item':
+            if categories is None or record['category'] in categories:
+                yield record['category'], record['item']
+    if not complete:
+        print(f"Warning: snapshot {filename} has no footer record and may be truncated")
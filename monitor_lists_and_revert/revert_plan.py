@@ -0,0 +1,54 @@
+from fingerprint import fingerprint
+
+
+def index_by_id(items, id_field):
+    """Index items by their ID field ('id' for monitors, 'public_id' for synthetic tests)."""
+    return {item.get(id_field): item for item in items if item.get(id_field) is not None}
+
+
+class BackupDiff:
+    """Single-pass join of the current items against an ID-keyed index of a backup.
+
+    Building the index is O(M) and each current item is matched with one
+    dict lookup, so a diff costs O(N + M) instead of scanning the backup for
+    every current item. Items present on only one side are reported as added
+    or deleted once the current items have been consumed.
+
+    Items are compared by configuration fingerprint, so fields Datadog
+    updates on its own (overall_state, modified_at, ...) never count as drift.
+    """
+
+    def __init__(self, backup_items, id_field):
+        self.id_field = id_field
+        self.backup_index = index_by_id(backup_items, id_field)
+        self.added = []
+        self.deleted = []
+        self.unchanged = 0
+        self.drifted = 0
+
+    def changed(self, current_items):
+        """Yield (item_id, current_item, backup_item) for every item whose configuration drifted from its backup."""
+        seen = set()
+        for current_item in current_items:
+            item_id = current_item.get(self.id_field)
+            backup_item = self.backup_index.get(item_id)
+            if backup_item is None:
+                self.added.append(item_id)
+                continue
+            seen.add(item_id)
+            if fingerprint(current_item) == fingerprint(backup_item):
+                self.unchanged += 1
+                continue
+            self.drifted += 1
+            yield item_id, current_item, backup_item
+        self.deleted = [item_id for item_id in self.backup_index if item_id not in seen]
+
+    def print_summary(self, item_type, max_ids=20):
+        """Print drift counts and the IDs of items added or deleted since the backup was taken."""
+        print(f"{item_type}: {self.drifted} drifted from the backup, {self.unchanged} unchanged")
+        for label, item_ids in (("added", self.added), ("deleted", self.deleted)):
+            if not item_ids:
+                continue
+            shown = ', '.join(str(item_id) for item_id in item_ids[:max_ids])
+            more = f" and {len(item_ids) - max_ids} more" if len(item_ids) > max_ids else ""
+            print(f"{len(item_ids)} {item_type}(s) {label} since the backup (not reverted): {shown}{more}")
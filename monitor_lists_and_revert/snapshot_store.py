@@ -0,0 +1,78 @@
+import json
+import os
+from datetime import datetime
+
+from fingerprint import canonical_json, fingerprint
+
+manifest_format = 'datadog-snapshot-manifest'
+
+
+class SnapshotStore:
+    """Content-addressed store of monitor and synthetic test configurations.
+
+    Each distinct configuration is written once to objects/<fp[:2]>/<fp>.json,
+    keyed by its fingerprint. A snapshot is a small manifest in manifests/
+    listing the (id, fingerprint) pairs of every category, so a new snapshot
+    only writes the configurations that changed since the previous one.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifests_dir = os.path.join(root, 'manifests')
+        self.new_objects = 0
+
+    def object_path(self, item_fingerprint):
+        return os.path.join(self.objects_dir, item_fingerprint[:2], f"{item_fingerprint}.json")
+
+    def put(self, item):
+        """Store the configuration of an item if it is not stored yet and return its fingerprint."""
+        item_fingerprint = fingerprint(item)
+        path = self.object_path(item_fingerprint)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.write(canonical_json(item))
+            os.replace(temp_path, path)
+            self.new_objects += 1
+        return item_fingerprint
+
+    def get(self, item_fingerprint):
+        """Load a stored configuration by fingerprint."""
+        with open(self.object_path(item_fingerprint), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def write_manifest(self, categories, name=None):
+        """Write a manifest of {category: [[item_id, fingerprint], ...]} and return its path."""
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        created_at = datetime.now()
+        name = name or created_at.strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.manifests_dir, f"{name}.json")
+        suffix = 1
+        while os.path.exists(path):
+            suffix += 1
+            path = os.path.join(self.manifests_dir, f"{name}_{suffix}.json")
+        manifest = {
+            'format': manifest_format,
+            'version': 1,
+            'created_at': created_at.isoformat(timespec='seconds'),
+            'categories': categories,
+        }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        return path
+
+    @classmethod
+    def for_manifest(cls, manifest_path):
+        """Open the store a manifest belongs to (the parent of its manifests/ directory)."""
+        return cls(os.path.dirname(os.path.dirname(os.path.abspath(manifest_path))))
+
+    def iter_items(self, manifest, category):
+        """Yield the stored configurations of one category of a loaded manifest."""
+        for _, item_fingerprint in manifest['categories'].get(category, []):
+            yield self.get(item_fingerprint)
+
+
+def is_manifest(data):
+    return isinstance(data, dict) and data.get('format') == manifest_format
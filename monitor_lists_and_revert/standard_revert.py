@@ -1,37 +1,34 @@
-import requests
-import json
 import os
+import sys
 from datetime import datetime
 
-# Datadog API details
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from datadog_common.client import DatadogClient
+from datadog_common.discovery import iter_monitors
+from datadog_common.response_cache import ResponseCache, cache_filename
+from backups import load_backup
+from revert_plan import BackupDiff
+
+# Datadog API details; DATADOG_URL points the script at another site or at load_testing/fake_datadog.py
 api_key = "xxxx"
 app_key = "xxxx"
-datadog_url = "https://us5.datadoghq.com/"
+datadog_url = os.environ.get("DATADOG_URL", "https://us5.datadoghq.com/")
 
-# Headers for authentication
-headers = {
-    "DD-API-KEY": api_key,
-    "DD-APPLICATION-KEY": app_key,
-    "Content-Type": "application/json"
-}
+# GET responses reused within the run and kept in a per-site, per-organization file for the next one;
+# lists and monitor states are revalidated with If-None-Match, so an unchanged result costs a 304
+response_cache = ResponseCache(cache_filename(datadog_url, api_key))
+
+# Pooled API client shared by every request in this script
+client = DatadogClient(datadog_url, api_key, app_key, cache=response_cache)
 
 def fetch_all_standard_monitors():
-    """Fetch all standard monitors from Datadog, excluding synthetic monitors."""
-    url = f"{datadog_url}/api/v1/monitor"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        all_monitors = response.json()
-        standard_monitors = [monitor for monitor in all_monitors if 'synthetics alert' not in monitor.get('type', '').lower()]
-        return standard_monitors
-    else:
-        print(f"Failed to fetch monitors, Status code: {response.status_code}")
-        return []
+    """Stream all standard monitors from Datadog page by page, excluding synthetic monitors."""
+    return iter_monitors(client)
 
 def revert_monitor(monitor_id, backup_data):
     """Revert a standard monitor to its previous state."""
-    url = f"{datadog_url}/api/v1/monitor/{monitor_id}"
-    response = requests.put(url, headers=headers, json=backup_data)
+    response = client.put(f"/api/v1/monitor/{monitor_id}", json=backup_data)
     
     if response.status_code == 200:
         print(f"Reverted standard monitor ID: {monitor_id} to previous state.")
@@ -40,25 +37,23 @@ def revert_monitor(monitor_id, backup_data):
         print(f"Response: {response.text}")
 
 def main():
-    # Load the backup JSON file
-    backup_filename = input("Enter the filename of the JSON backup to revert from (e.g., previous_backup.json): ")
-    with open(backup_filename, 'r') as file:
-        backup_data = json.load(file)
-
-    standard_monitors_backup = backup_data if isinstance(backup_data, list) else backup_data.get('standard_monitors', [])
+    # Load the backup JSON file or snapshot manifest
+    backup_filename = input("Enter the filename of the JSON backup or snapshot manifest to revert from (e.g., previous_backup.json): ")
+    standard_monitors_backup = load_backup(backup_filename, 'standard_monitors')
 
     # Fetch the current state of all standard monitors
     current_standard_monitors = fetch_all_standard_monitors()
 
-    # Revert changes if detected
-    for current_monitor in current_standard_monitors:
-        current_id = current_monitor.get('id')
-        for backup_monitor in standard_monitors_backup:
-            if current_id == backup_monitor.get('id'):
-                if current_monitor != backup_monitor:
-                    print(f"Detected changes in standard monitor ID: {current_id}. Reverting...")
-                    revert_monitor(current_id, backup_monitor)
-                    break
+    # Revert changes if detected, joining against an ID index of the backup in one pass
+    diff = BackupDiff(standard_monitors_backup, 'id')
+    for current_id, current_item, backup_item in diff.changed(current_standard_monitors):
+        print(f"Detected changes in standard monitor ID: {current_id}. Reverting...")
+        revert_monitor(current_id, backup_item)
+    diff.print_summary("standard monitor")
+
+    client.stats.print_summary()
+    response_cache.print_summary()
+    response_cache.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'alert_scripts'))
+
+import pytest
+
+from monitor_query import evaluation_window_seconds, mutate_query, parse_threshold
+
+
+@pytest.mark.parametrize('query, comparator, threshold', [
+    ('avg(last_5m):avg:system.cpu.user{*} > 90', '>', '90'),
+    ('avg(last_5m):avg:system.cpu.user{*} >= 90.5', '>=', '90.5'),
+    ('min(last_1h):avg:system.disk.free{*} < -1e3  ', '<', '-1e3'),
+    ('max(last_5m):avg:system.load.1{*}<=2', '<=', '2'),
+])
+def test_parse_threshold(query, comparator, threshold):
+    assert parse_threshold(query) == (comparator, threshold, query.rindex(comparator))
+
+
+@pytest.mark.parametrize('query', [
+    None,
+    '',
+    '12345 && 67890',
+    'avg(last_5m):avg:system.cpu.user{*} > 90 && avg(last_5m):avg:system.load.1{*}',
+    'avg(last_5m):avg:system.cpu.user{*} > threshold',
+])
+def test_parse_threshold_without_trailing_comparison(query):
+    assert parse_threshold(query) is None
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('avg(last_5m):avg:system.cpu.user{host:a} by {host} > 90',
+     'avg(last_5m):avg:system.cpu.user{host:a} by {host} <= 90'),
+    ('avg(last_5m):avg:system.cpu.user{*} >= 90', 'avg(last_5m):avg:system.cpu.user{*} < 90'),
+    ('min(last_15m):avg:system.disk.free{*} < 10', 'min(last_15m):avg:system.disk.free{*} >= 10'),
+    ('max(last_5m):avg:system.load.1{*}<=-2.5', 'max(last_5m):avg:system.load.1{*} > -2.5'),
+    ('logs("status:error").index("*").rollup("count").last("5m") > 100',
+     'logs("status:error").index("*").rollup("count").last("5m") <= 100'),
+])
+def test_mutate_query_negates_the_trailing_comparison(query, expected):
+    assert mutate_query(query) == (expected, None)
+
+
+def test_mutate_query_leaves_earlier_comparisons_alone():
+    query = 'avg(last_5m):avg:a{*} > 0 ? 1 : 0 >= 1'
+    assert mutate_query(query) == ('avg(last_5m):avg:a{*} > 0 ? 1 : 0 < 1', None)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('avg(last_1w):avg:a{*} > 1', 'avg(last_1w):avg:a{*} <= 1'),
+    ('sum(last_2d):sum:a{*}.as_count() > 1', 'sum(last_2d):sum:a{*}.as_count() <= 1'),
+])
+def test_mutate_query_keeps_long_evaluation_windows(query, expected):
+    mutated, reason = mutate_query(query)
+    assert (mutated, reason) == (expected, None)
+    assert evaluation_window_seconds(mutated) == evaluation_window_seconds(query)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('change(avg(last_5m),last_5m):avg:a{*} > 10', 'change(avg(last_5m),last_5m):avg:a{*} <= 10'),
+    ('pct_change(avg(last_1h),last_1w):avg:a{*} < -50', 'pct_change(avg(last_1h),last_1w):avg:a{*} >= -50'),
+])
+def test_mutate_query_negates_change_queries_without_touching_their_windows(query, expected):
+    assert mutate_query(query) == (expected, None)
+
+
+@pytest.mark.parametrize('query, function', [
+    ('avg(last_5m):anomalies(avg:foo{*}, "basic", 2) >= 1', 'anomalies'),
+    ("max(next_1w):forecast(avg:system.disk.in_use{*}, 'linear', 1) >= 0.9", 'forecast'),
+    ("avg(last_15m):outliers(avg:system.cpu.user{*} by {host}, 'dbscan', 3) > 0", 'outliers'),
+])
+def test_mutate_query_refuses_fixed_threshold_functions(query, function):
+    mutated, reason = mutate_query(query)
+    assert mutated is None
+    assert function in reason
+
+
+@pytest.mark.parametrize('query', [None, '', '12345 && 67890', 'events("priority:all").rollup("count")'])
+def test_mutate_query_without_threshold(query):
+    assert mutate_query(query) == (None, 'Query has no trailing threshold comparison')
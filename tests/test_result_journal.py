@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'alert_scripts'))
+
+import pytest
+
+from result_journal import ResultJournal
+
+fieldnames = ['MonitorType', 'MonitorName', 'MonitorID', 'Remarks']
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return ResultJournal(str(tmp_path / 'results.csv.journal'), fieldnames)
+
+
+def read_csv(filename):
+    with open(filename, newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def test_compact_writes_one_row_per_monitor_in_first_seen_order(journal, tmp_path):
+    journal.open()
+    journal.record(2, {'MonitorType': 'Standard', 'MonitorName': 'b', 'MonitorID': 2})
+    journal.record(1, {'MonitorType': 'API', 'MonitorName': 'a', 'MonitorID': 1})
+    journal.record(2, {'Remarks': 'Monitor reverted and back to OK state'})
+    csv_filename = str(tmp_path / 'results.csv')
+    journal.compact(csv_filename)
+
+    assert read_csv(csv_filename) == [
+        {'MonitorType': 'Standard', 'MonitorName': 'b', 'MonitorID': '2',
+         'Remarks': 'Monitor reverted and back to OK state'},
+        {'MonitorType': 'API', 'MonitorName': 'a', 'MonitorID': '1', 'Remarks': ''},
+    ]
+    assert not os.path.exists(f"{csv_filename}.tmp")
+
+
+def test_compact_leaves_out_unknown_columns(journal, tmp_path):
+    journal.record(1, {'MonitorID': 1, 'Remarks': 'ok', 'Unexpected': 'x'})
+    csv_filename = str(tmp_path / 'results.csv')
+    journal.compact(csv_filename)
+
+    with open(csv_filename, newline='') as file:
+        assert next(csv.reader(file)) == fieldnames
+    assert read_csv(csv_filename) == [{'MonitorType': '', 'MonitorName': '', 'MonitorID': '1', 'Remarks': 'ok'}]
+
+
+def test_last_write_wins_for_a_repeated_monitor_id(journal):
+    journal.open()
+    journal.record(7, {'MonitorID': 7, 'Remarks': 'Monitor did not enter ALERT state'})
+    journal.record('7', {'Remarks': 'Monitor reverted and back to OK state'})
+    journal.record(7, {'MonitorName': 'renamed'})
+    journal.close()
+
+    assert journal.rows() == [
+        {'MonitorID': 7, 'Remarks': 'Monitor reverted and back to OK state', 'MonitorName': 'renamed'}]
+
+
+def test_torn_trailing_line_is_skipped(journal, tmp_path):
+    journal.open()
+    journal.record(1, {'MonitorID': 1, 'Remarks': 'first'})
+    journal.record(2, {'MonitorID': 2, 'Remarks': 'second'})
+    journal.close()
+    with open(journal.filename, 'a', encoding='utf-8') as file:
+        file.write(json.dumps({'MonitorID': '1', 'data': {'Remarks': 'torn'}})[:25])
+
+    assert journal.rows() == [{'MonitorID': 1, 'Remarks': 'first'}, {'MonitorID': 2, 'Remarks': 'second'}]
+    csv_filename = str(tmp_path / 'results.csv')
+    journal.compact(csv_filename)
+    assert [row['Remarks'] for row in read_csv(csv_filename)] == ['first', 'second']
+
+
+def test_resumed_run_appends_to_the_journal(journal):
+    journal.open()
+    journal.record(1, {'MonitorID': 1, 'Remarks': 'interrupted'})
+    journal.close()
+
+    journal.open('a')
+    journal.record(1, {'Remarks': 'resumed'})
+    journal.close()
+    assert journal.rows() == [{'MonitorID': 1, 'Remarks': 'resumed'}]
+
+    journal.open()
+    journal.close()
+    assert journal.rows() == []
+
+
+def test_missing_journal_compacts_to_a_header_only_csv(journal, tmp_path):
+    csv_filename = str(tmp_path / 'results.csv')
+    journal.compact(csv_filename)
+    assert read_csv(csv_filename) == []
+
+
+def test_resumed_run_after_a_torn_line_keeps_its_first_update(journal):
+    journal.open()
+    journal.record(1, {'MonitorID': 1, 'Remarks': 'first'})
+    journal.close()
+    with open(journal.filename, 'a', encoding='utf-8') as file:
+        file.write('{"MonitorID": "1", "da')
+
+    journal.open('a')
+    journal.record(1, {'Remarks': 'resumed'})
+    journal.close()
+    assert journal.rows() == [{'MonitorID': 1, 'Remarks': 'resumed'}]
@@ -0,0 +1,157 @@
+import asyncio
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'alert_scripts'))
+
+import pytest
+
+from checkpoint import DrillCheckpoint, check_interrupted_run
+from drill_engine import AlertPhase
+from drill_metrics import DrillMetrics
+from drill_strategies import drill_any, invalid_test_url, strategies, strategy_for
+
+
+class Response:
+    status_code = 200
+    text = ''
+
+
+class FakeEngine:
+    """The parts of DrillEngine a drill uses, over a dict of monitor states that follow the last PUT."""
+
+    stop_reason = None
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.metrics = DrillMetrics()
+        self.rows = {}
+        self.puts = []
+        self.states = {}
+
+    def has_time_for(self, seconds):
+        return True
+
+    def wait_budget(self, seconds):
+        return seconds
+
+    def alert_phase(self):
+        return AlertPhase(None)
+
+    def record_result(self, monitor_id, row):
+        self.rows[monitor_id] = dict(row)
+
+    async def put(self, path, json):
+        self.puts.append((path, copy.deepcopy(json)))
+        broken = invalid_test_url in str(json) or json.get('query', '').endswith('<= 90')
+        self.states[path.rsplit('/', 1)[1]] = 'Alert' if broken else 'OK'
+        return Response()
+
+    async def trigger_synthetic_test(self, public_id):
+        return Response(), [{'public_id': public_id}]
+
+    async def wait_for_state(self, monitor_id, desired_state, max_wait_time, transition_window=None):
+        await asyncio.sleep(0)
+        return next(iter(self.states.values()), 'OK')
+
+
+monitor = {
+    'id': 101,
+    'name': 'CPU high',
+    'query': 'avg(last_5m):avg:system.cpu.user{*} > 90',
+    'message': 'CPU is high @slack-team',
+    'options': {'thresholds': {'critical': 90, 'warning': 80}},
+}
+
+api_test = {
+    'public_id': 'abc-def-ghi',
+    'monitor_id': 202,
+    'name': 'Health check',
+    'type': 'api',
+    'config': {'request': {'method': 'GET', 'url': 'https://example.com/health'}},
+    'options': {'tick_every': 300},
+}
+
+
+def seeded_engine(item, phase, state):
+    """Return an engine whose checkpoint holds item mid-drill at phase, with the monitor currently in state."""
+    strategy = strategy_for(item)
+    monitor_id, name, resource_id = strategy.identify(item)
+    checkpoint = DrillCheckpoint()
+    checkpoint.open()
+    row = dict.fromkeys(strategy.csv_fieldnames, '')
+    row.update({'MonitorType': strategy.monitor_type, 'MonitorName': name, 'MonitorID': monitor_id,
+                strategy.original_column: strategy.original_value(item),
+                strategy.changed_column: strategy.changed_value(item)})
+    checkpoint.save(monitor_id, strategy.monitor_type, phase, item=item, row=row)
+    engine = FakeEngine(checkpoint)
+    engine.states[str(resource_id)] = state
+    return engine, strategy, monitor_id
+
+
+@pytest.mark.parametrize('item', [monitor, api_test], ids=['standard', 'api'])
+@pytest.mark.parametrize('phase, state', [
+    ('mutating', 'OK'),
+    ('mutating', 'Alert'),
+    ('alert_wait', 'Alert'),
+    ('reverting', 'Alert'),
+])
+def test_resume_restores_the_original_without_mutating_again(item, phase, state):
+    engine, strategy, monitor_id = seeded_engine(item, phase, state)
+    resumed = engine.checkpoint.in_flight()
+    assert resumed == [item]
+
+    asyncio.run(drill_any(engine, copy.deepcopy(resumed[0])))
+
+    expected = strategy.restored(copy.deepcopy(item))
+    assert engine.puts == [(strategy.update_path(item), expected)]
+    assert engine.checkpoint.load(monitor_id)['phase'] == 'done'
+    assert engine.checkpoint.in_flight() == []
+
+
+def test_resume_at_ok_wait_only_waits_for_recovery():
+    engine, strategy, monitor_id = seeded_engine(monitor, 'ok_wait', 'OK')
+    saved = engine.checkpoint.load(monitor_id)
+    saved['row'].update({'MonitorAlertState': 'Alert', 'MonitorAlertStateTime': '2024-01-01 00:00:00'})
+    engine.checkpoint.save(monitor_id, strategy.monitor_type, 'ok_wait', row=saved['row'])
+
+    asyncio.run(drill_any(engine, copy.deepcopy(monitor)))
+
+    assert engine.puts == []
+    assert engine.rows[monitor_id]['MonitorOkState'] == 'OK'
+    assert engine.checkpoint.load(monitor_id)['phase'] == 'done'
+
+
+def test_resume_skips_finished_drills():
+    engine, _, monitor_id = seeded_engine(monitor, 'done', 'OK')
+    asyncio.run(drill_any(engine, copy.deepcopy(monitor)))
+    assert engine.puts == []
+    assert monitor_id not in engine.rows
+
+
+def test_fresh_drill_mutates_then_restores():
+    checkpoint = DrillCheckpoint()
+    checkpoint.open()
+    engine = FakeEngine(checkpoint)
+    strategy = strategies['Standard']
+
+    asyncio.run(drill_any(engine, copy.deepcopy(monitor)))
+
+    assert [body for _, body in engine.puts] == [strategy.broken(monitor), strategy.restored(monitor)]
+    assert engine.rows[monitor['id']]['Remarks'] == 'Monitor reverted and back to OK state'
+
+
+@pytest.mark.parametrize('phase', ['mutating', 'alert_wait', 'reverting', 'ok_wait'])
+def test_plain_rerun_refuses_to_start_while_drills_are_in_flight(phase, capsys):
+    engine, _, _ = seeded_engine(monitor, phase, 'Alert')
+    assert check_interrupted_run(engine.checkpoint, resume=False, fresh=False) is False
+    assert '--resume' in capsys.readouterr().out
+    assert check_interrupted_run(engine.checkpoint, resume=True, fresh=False) is True
+    assert check_interrupted_run(engine.checkpoint, resume=False, fresh=True) is True
+
+
+@pytest.mark.parametrize('phase', ['new', 'done'])
+def test_plain_rerun_starts_without_drills_in_flight(phase):
+    engine, _, _ = seeded_engine(monitor, phase, 'OK')
+    assert check_interrupted_run(engine.checkpoint, resume=False, fresh=False) is True
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'alert_scripts'))
+
+from adaptive_polling import expected_drill_seconds
+from waves import WaveRollout
+
+
+def monitor(monitor_id, team, window):
+    return {'id': monitor_id, 'tags': [f"team:{team}"], 'query': f"avg({window}):avg:a{{*}} > 1"}
+
+
+items = [
+    monitor(1, 'slow', 'last_1w'),
+    monitor(2, 'mixed', 'last_2d'),
+    monitor(3, 'mixed', 'last_5m'),
+    monitor(4, 'quick', 'last_5m'),
+    monitor(5, 'quick', 'last_15m'),
+]
+
+
+def test_plan_keeps_groups_together_in_discovery_order():
+    waves = WaveRollout('team', wave_size=2).plan(items)
+    assert [(names, [item['id'] for item in wave]) for names, wave in waves] == [
+        (['slow'], [1]), (['mixed'], [2, 3]), (['quick'], [4, 5])]
+
+
+def test_plan_quickest_first_orders_waves_and_their_items():
+    waves = WaveRollout('team', wave_size=2, quickest_first=True).plan(items)
+    assert [[item['id'] for item in wave] for _, wave in waves] == [[4, 5], [3, 2], [1]]
+    for _, wave in waves:
+        assert [expected_drill_seconds(item) for item in wave] == sorted(map(expected_drill_seconds, wave))
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'alert_scripts'))
+
+import pytest
+
+from state_poller import StatePoller
+from webhook_receiver import WebhookReceiver, parse_notification, token_header
+
+token = 'drill-token'
+
+
+@pytest.mark.parametrize('body, expected', [
+    ({'monitor_id': '123', 'transition': 'Triggered', 'alert_type': 'error'}, ('123', 'Alert')),
+    ({'monitor_id': '123', 'transition': 'Re-Triggered'}, ('123', 'Alert')),
+    ({'monitor_id': 123, 'transition': 'Recovered', 'alert_type': 'success'}, ('123', 'OK')),
+    ({'alert_id': '456', 'alert_transition': 'No Data'}, ('456', 'No Data')),
+    ({'monitor_id': '789', 'transition': '', 'alert_type': 'success'}, ('789', 'OK')),
+])
+def test_parse_notification(body, expected):
+    assert parse_notification(body) == expected
+
+
+@pytest.mark.parametrize('body', [
+    None,
+    'Triggered',
+    ['123', 'Triggered'],
+    {},
+    {'transition': 'Triggered'},
+    {'monitor_id': '123'},
+    {'monitor_id': '123', 'transition': 'Renotify'},
+    {'monitor_id': '$ALERT_ID', 'transition': '$ALERT_TRANSITION', 'alert_type': '$ALERT_TYPE'},
+])
+def test_parse_notification_without_monitor_or_state(body):
+    assert parse_notification(body) is None
+
+
+@pytest.fixture(scope='module')
+def server():
+    notifications = []
+    receiver = WebhookReceiver(lambda monitor_id, state: notifications.append((monitor_id, state)),
+                               port=0, token=token)
+    receiver.notifications = notifications
+    receiver.url = receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+@pytest.fixture
+def receiver(server):
+    server.notifications.clear()
+    server.received = server.ignored = server.rejected = 0
+    return server
+
+
+def post(url, data, headers=None):
+    """POST data to url and return the response status."""
+    request = urllib.request.Request(url, data=data, headers=headers or {}, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_receiver_dispatches_alert_and_ok_notifications(receiver):
+    alert = json.dumps({'monitor_id': '123', 'transition': 'Triggered'}).encode()
+    ok = json.dumps({'monitor_id': '123', 'transition': 'Recovered'}).encode()
+    assert post(receiver.url, alert) == 202
+    assert post(receiver.url.rsplit('/', 1)[0], ok, {token_header: token}) == 202
+    assert receiver.notifications == [('123', 'Alert'), ('123', 'OK')]
+    assert (receiver.received, receiver.ignored, receiver.rejected) == (2, 0, 0)
+
+
+@pytest.mark.parametrize('path, headers', [
+    ('', {}),
+    ('/wrong-token', {}),
+    ('', {token_header: 'wrong-token'}),
+    (f"/{token}-suffix", {}),
+])
+def test_receiver_rejects_requests_without_the_token(receiver, path, headers):
+    base_url = receiver.url.rsplit('/', 1)[0]
+    body = json.dumps({'monitor_id': '123', 'transition': 'Triggered'}).encode()
+    assert post(f"{base_url}{path}", body, headers) == 403
+    assert receiver.notifications == []
+    assert (receiver.received, receiver.rejected) == (0, 1)
+
+
+@pytest.mark.parametrize('data', [b'', b'{"monitor_id": "123", "transition": ', b'[1, 2]', b'{"monitor_id": "123"}'])
+def test_receiver_ignores_malformed_bodies(receiver, data):
+    assert post(receiver.url, data) == 400
+    assert receiver.notifications == []
+    assert (receiver.received, receiver.ignored) == (0, 1)
+
+
+def test_notification_for_a_monitor_nobody_waits_on_is_dropped():
+    async def fetch_states(monitor_ids):
+        return {}
+
+    async def run():
+        poller = StatePoller(fetch_states, polling_interval=3600)
+        receiver = WebhookReceiver(poller.notify, token=token)
+        waiting = asyncio.ensure_future(poller.wait_for_state('1', 'Alert', max_wait_time=5))
+        await asyncio.sleep(0)
+
+        assert receiver.dispatch({'monitor_id': '2', 'transition': 'Triggered'})
+        assert receiver.dispatch({'monitor_id': '1', 'transition': 'Recovered'})
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        assert receiver.dispatch({'monitor_id': '1', 'transition': 'Triggered'})
+        state = await waiting
+        await poller.stop()
+        return state, poller.in_flight()
+
+    assert asyncio.run(run()) == ('Alert', 0)